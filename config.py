@@ -1,22 +1,39 @@
-from dataclasses import dataclass
+import functools
 import os
 from dataclasses import dataclass
-from typing import Optional
+from enum import Enum
+from typing import Any, Callable, Optional
+
+_TRUE_VALUES = frozenset(("1", "true", "t", "yes", "y"))
 
 
 def str2bool(v: str | None, default: bool = False) -> bool:
     if v is None:
         return default
-    return v.lower() in {"1", "true", "t", "yes", "y"}
+    return v.lower() in _TRUE_VALUES
+
+
+class Profile(str, Enum):
+    """运行环境：决定端点默认值（BINANCE_PROFILE=live|testnet）"""
+    LIVE = "live"
+    TESTNET = "testnet"
+
 
+# 各环境的端点默认值：(ws_base, rest_base)；WS_BASE/REST_BASE 显式设置时仍以环境变量为准
+_PROFILE_ENDPOINTS: dict[Profile, tuple[str, str]] = {
+    Profile.LIVE: ("wss://fstream.binance.com", "https://fapi.binance.com"),
+    Profile.TESTNET: ("wss://stream.binancefuture.com", "https://testnet.binancefuture.com"),
+}
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Config:
     # ---------------------------
     # 应用运行级参数（通用）
     # ---------------------------
     log_level: str = "INFO"              # 日志等级：DEBUG/INFO/WARN/ERROR
     db_path: str = "trader.db"            # SQLite 数据库文件路径
+    db_flush_ms: int = 50                 # 后台批量写入间隔（毫秒），0 表示每次写入同步提交
     tz: str = "UTC"                       # 时区（仅用于日志/显示）
 
     # ---------------------------
@@ -72,106 +89,77 @@ class Config:
     qty_precision: int = 3                # 数量精度（用于简单数量四舍五入/截断）
     price_round: int = 2                  # 价格保留小数位（用于止损 stopPrice 舍入）
     stop_loss_working_type: str = "CONTRACT_PRICE"  # 止损触发价格类型（MARK_PRICE/CONTRACT_PRICE）
+    position_ttl: float = 5.0             # 仓位信息缓存时间（秒），0 表示每次都请求
 
     # ---------------------------
     # 端点配置（可用环境覆盖）
     # ---------------------------
+    profile: str = Profile.LIVE.value            # 运行环境 live/testnet（决定端点默认值）
     ws_base: str = "wss://fstream.binance.com"   # 行情 WebSocket 基础地址（正式网 Futures）
     rest_base: str = "https://fapi.binance.com"  # REST 下单基础地址（正式网）
 
 
-def load_config() -> Config:
-    # 单一默认来源：Config 的默认值
-    defaults = Config()
+def _strip_slash(v: str) -> str:
+    return v.rstrip("/")
 
-    # 基础
-    log_level = (os.getenv("LOG_LEVEL") or defaults.log_level).upper()
-    db_path = os.getenv("DB_PATH") or defaults.db_path
-    tz = os.getenv("TZ") or defaults.tz
 
+# 环境变量 -> Config 字段：(环境变量名, 字段名, 类型转换)
+# 未设置或为空字符串时使用 Config 的默认值（单一默认来源）
+_ENV_SPEC: tuple[tuple[str, str, Callable[[str], Any]], ...] = (
+    # 基础
+    ("LOG_LEVEL", "log_level", str.upper),
+    ("DB_PATH", "db_path", str),
+    ("DB_FLUSH_MS", "db_flush_ms", int),
+    ("TZ", "tz", str),
     # 交易所与订阅
-    api_key = os.getenv("BINANCE_API_KEY") or None
-    api_secret = os.getenv("BINANCE_API_SECRET") or None
-    symbol = (os.getenv("SYMBOL") or defaults.symbol).upper()
-    interval = os.getenv("INTERVAL") or defaults.interval
-    window = int(os.getenv("WINDOW") or defaults.window)
-
+    ("BINANCE_API_KEY", "api_key", str),
+    ("BINANCE_API_SECRET", "api_secret", str),
+    ("SYMBOL", "symbol", str.upper),
+    ("INTERVAL", "interval", str),
+    ("WINDOW", "window", int),
     # 策略与风控
-    stop_loss_pct = float(os.getenv("STOP_LOSS_PCT") or defaults.stop_loss_pct)
-    max_position_pct = float(os.getenv("MAX_POSITION_PCT") or defaults.max_position_pct)
-    leverage = int(os.getenv("LEVERAGE") or defaults.leverage)
-    only_on_close = str2bool(os.getenv("ONLY_ON_CLOSE"), defaults.only_on_close)
-    stop_loss_enabled = str2bool(os.getenv("STOP_LOSS_ENABLED"), defaults.stop_loss_enabled)
-    use_breakout_level_for_entry = str2bool(os.getenv("USE_BREAKOUT_LEVEL_FOR_ENTRY"), defaults.use_breakout_level_for_entry)
-    reentry_buffer_pct = float(os.getenv("REENTRY_BUFFER_PCT") or defaults.reentry_buffer_pct)
-    
+    ("STOP_LOSS_PCT", "stop_loss_pct", float),
+    ("MAX_POSITION_PCT", "max_position_pct", float),
+    ("LEVERAGE", "leverage", int),
+    ("ONLY_ON_CLOSE", "only_on_close", str2bool),
+    ("STOP_LOSS_ENABLED", "stop_loss_enabled", str2bool),
+    ("USE_BREAKOUT_LEVEL_FOR_ENTRY", "use_breakout_level_for_entry", str2bool),
+    ("REENTRY_BUFFER_PCT", "reentry_buffer_pct", float),
     # 模拟交易
-    simulate_trading = str2bool(os.getenv("SIMULATE_TRADING"), defaults.simulate_trading)
-    simulate_balance = float(os.getenv("SIMULATE_BALANCE") or defaults.simulate_balance)
-
+    ("SIMULATE_TRADING", "simulate_trading", str2bool),
+    ("SIMULATE_BALANCE", "simulate_balance", float),
     # 指标参数
-    boll_multiplier = float(os.getenv("BOLL_MULTIPLIER") or defaults.boll_multiplier)
-    boll_ddof = int(os.getenv("BOLL_DDOF") or defaults.boll_ddof)
-    indicator_max_rows = int(os.getenv("INDICATOR_MAX_ROWS") or defaults.indicator_max_rows)
-
+    ("BOLL_MULTIPLIER", "boll_multiplier", float),
+    ("BOLL_DDOF", "boll_ddof", int),
+    ("INDICATOR_MAX_ROWS", "indicator_max_rows", int),
     # WebSocket
-    ws_ping_interval = int(os.getenv("WS_PING_INTERVAL") or defaults.ws_ping_interval)
-    ws_ping_timeout = int(os.getenv("WS_PING_TIMEOUT") or defaults.ws_ping_timeout)
-    ws_backoff_initial = int(os.getenv("WS_BACKOFF_INITIAL") or defaults.ws_backoff_initial)
-    ws_backoff_max = int(os.getenv("WS_BACKOFF_MAX") or defaults.ws_backoff_max)
-    ws_open_timeout = int(os.getenv("WS_OPEN_TIMEOUT") or defaults.ws_open_timeout)
-
+    ("WS_PING_INTERVAL", "ws_ping_interval", int),
+    ("WS_PING_TIMEOUT", "ws_ping_timeout", int),
+    ("WS_BACKOFF_INITIAL", "ws_backoff_initial", int),
+    ("WS_BACKOFF_MAX", "ws_backoff_max", int),
+    ("WS_OPEN_TIMEOUT", "ws_open_timeout", int),
     # 下单与网络
-    recv_window = int(os.getenv("RECV_WINDOW") or defaults.recv_window)
-    http_timeout = int(os.getenv("HTTP_TIMEOUT") or defaults.http_timeout)
-    qty_precision = int(os.getenv("QTY_PRECISION") or defaults.qty_precision)
-    price_round = int(os.getenv("PRICE_ROUND") or defaults.price_round)
-    stop_loss_working_type = os.getenv("STOP_LOSS_WORKING_TYPE") or defaults.stop_loss_working_type
-
+    ("RECV_WINDOW", "recv_window", int),
+    ("HTTP_TIMEOUT", "http_timeout", int),
+    ("QTY_PRECISION", "qty_precision", int),
+    ("PRICE_ROUND", "price_round", int),
+    ("STOP_LOSS_WORKING_TYPE", "stop_loss_working_type", str),
+    ("POSITION_TTL", "position_ttl", float),
     # 端点（仅主网，支持显式覆盖）
-    ws_base = (os.getenv("WS_BASE") or defaults.ws_base).rstrip("/")
-    rest_base = (os.getenv("REST_BASE") or defaults.rest_base).rstrip("/")
-
-    return Config(
-        # 基础
-        log_level=log_level,
-        db_path=db_path,
-        tz=tz,
-        # 交易所与订阅
-        api_key=api_key,
-        api_secret=api_secret,
-        symbol=symbol,
-        interval=interval,
-        window=window,
-        # 策略与风控
-        stop_loss_pct=stop_loss_pct,
-        max_position_pct=max_position_pct,
-        leverage=leverage,
-        only_on_close=only_on_close,
-        stop_loss_enabled=stop_loss_enabled,
-        use_breakout_level_for_entry=use_breakout_level_for_entry,
-        reentry_buffer_pct=reentry_buffer_pct,
-        # 模拟交易
-        simulate_trading=simulate_trading,
-        simulate_balance=simulate_balance,
-        # 指标
-        boll_multiplier=boll_multiplier,
-        boll_ddof=boll_ddof,
-        indicator_max_rows=indicator_max_rows,
-        # WebSocket
-        ws_ping_interval=ws_ping_interval,
-        ws_ping_timeout=ws_ping_timeout,
-        ws_backoff_initial=ws_backoff_initial,
-        ws_backoff_max=ws_backoff_max,
-        # 新增
-        ws_open_timeout=ws_open_timeout,
-        # 下单与网络
-        recv_window=recv_window,
-        http_timeout=http_timeout,
-        qty_precision=qty_precision,
-        price_round=price_round,
-        stop_loss_working_type=stop_loss_working_type,
-        # 端点
-        ws_base=ws_base,
-        rest_base=rest_base,
-    )
\ No newline at end of file
+    ("WS_BASE", "ws_base", _strip_slash),
+    ("REST_BASE", "rest_base", _strip_slash),
+)
+
+
+@functools.lru_cache(maxsize=1)
+def load_config() -> Config:
+    # 进程内只解析一次环境变量（需在 .env 加载之后首次调用）
+    env = os.environ
+    profile = Profile((env.get("BINANCE_PROFILE") or Profile.LIVE.value).strip().lower())
+    ws_base, rest_base = _PROFILE_ENDPOINTS[profile]
+    overrides = {"profile": profile.value, "ws_base": ws_base, "rest_base": rest_base}
+    for name, attr, cast in _ENV_SPEC:
+        v = env.get(name)
+        if v:
+            overrides[attr] = cast(v)
+    return Config(**overrides)
@@ -1,5 +1,13 @@
 import aiosqlite
+import asyncio
+import itertools
 import logging
+import sqlite3
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+
+import numpy as np
 
 INIT_SQL = """
 CREATE TABLE IF NOT EXISTS klines (
@@ -56,58 +64,371 @@ CREATE TABLE IF NOT EXISTS strategy_state (
     breakout_dn INTEGER DEFAULT 0,
     last_close_price REAL
 );
+
+-- 按时间排序读取交易/策略状态时走索引，避免全表扫描 + 临时B树排序
+CREATE INDEX IF NOT EXISTS idx_trades_ts ON trades(ts);
+CREATE INDEX IF NOT EXISTS idx_strategy_state_ts ON strategy_state(ts DESC);
+CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals(ts);
+-- 已收盘K线的部分覆盖索引：实时BOLL/回补只读 open_time+close，可直接由索引返回
+CREATE INDEX IF NOT EXISTS idx_klines_closed_ot ON klines(open_time DESC, is_closed, close) WHERE is_closed=1;
+"""
+
+# 热路径 SQL 作为模块级常量：同一连接上字符串完全一致，sqlite3 语句缓存每次都能命中，免去重复编译
+_STMT_CACHE_SIZE = 128
+_SQL_INSERT_KLINE = "INSERT OR REPLACE INTO klines(open_time, close_time, open, high, low, close, volume, is_closed) VALUES (?,?,?,?,?,?,?,?)"
+_SQL_UPSERT_IND = "INSERT OR REPLACE INTO indicators(open_time, ma, std, up, dn) VALUES (?,?,?,?,?)"
+_SQL_INSERT_SIGNAL = "INSERT INTO signals(ts, signal, price) VALUES (?,?,?)"
+_SQL_INSERT_TRADE = "INSERT INTO trades(ts, side, qty, price, order_id, status) VALUES (?,?,?,?,?,?)"
+_SQL_INSERT_ERROR = "INSERT INTO errors(ts, where_, error) VALUES (?,?,?)"
+# 使用子查询选取最近一条未标记为OVER的开仓记录
+_SQL_MARK_TRADE_OVER = """
+UPDATE trades
+SET status = 'OVER'
+WHERE id = (
+    SELECT id FROM trades
+    WHERE side IN (?, ?)
+      AND (status IS NULL OR status <> 'OVER')
+    ORDER BY ts DESC
+    LIMIT 1
+)
+"""
+# 策略状态只读最新一条：固定写入 id=1 的单行（UPSERT），表不再随 tick 增长
+_SQL_SAVE_STATE = """
+INSERT INTO strategy_state(id, ts, position, pending, entry_price, breakout_level, breakout_up, breakout_dn, last_close_price)
+VALUES (1,?,?,?,?,?,?,?,?)
+ON CONFLICT(id) DO UPDATE SET
+    ts=excluded.ts, position=excluded.position, pending=excluded.pending, entry_price=excluded.entry_price,
+    breakout_level=excluded.breakout_level, breakout_up=excluded.breakout_up, breakout_dn=excluded.breakout_dn,
+    last_close_price=excluded.last_close_price
 """
+# 旧版本逐 tick 追加的历史快照：只保留最新一条（以及 id=1 的单行）
+_SQL_PRUNE_STATE = "DELETE FROM strategy_state WHERE id <> 1 AND ts < (SELECT MAX(ts) FROM strategy_state)"
+_SQL_LATEST_STATE = "SELECT position, pending, entry_price, breakout_level, breakout_up, breakout_dn, last_close_price FROM strategy_state ORDER BY ts DESC LIMIT 1"
+# 子查询取最近 N 根，外层按时间升序返回，调用方无需再反转
+_SQL_RECENT_KLINES = "SELECT * FROM (SELECT open_time, close_time, open, high, low, close, volume FROM klines ORDER BY open_time DESC LIMIT ?) ORDER BY open_time ASC"
+_SQL_LATEST_CLOSED_OT = "SELECT open_time FROM klines WHERE is_closed=1 ORDER BY open_time DESC LIMIT 1"
+_SQL_RECENT_CLOSED_KLINES = "SELECT open_time, close_time, open, high, low, close, volume FROM klines WHERE is_closed=1 ORDER BY open_time DESC LIMIT ?"
+_SQL_CLOSED_OT_RANGE = "SELECT open_time FROM klines WHERE is_closed=1 AND open_time BETWEEN ? AND ?"
+
+# 后台写队列中"后写覆盖前写"的语句 -> 主键所在参数下标（None 表示固定单行）；同一批内只需执行最后一次
+_COALESCE_KEY = {_SQL_INSERT_KLINE: 0, _SQL_UPSERT_IND: 0, _SQL_SAVE_STATE: None}
+
+
+# 这些写入对应已发往交易所的真实订单/信号，不进后台队列：调用方同步等待提交，失败时异常照常抛给调用方
+_SYNC_SQL = frozenset((_SQL_INSERT_SIGNAL, _SQL_INSERT_TRADE, _SQL_MARK_TRADE_OVER))
+# 后台写入失败后放回队首重试的最大轮数，超过后才丢弃（并记 ERROR 日志）
+_MAX_RETRY_ROUNDS = 20
+
+
+def _coalesce_key(sql: str, params):
+    if sql not in _COALESCE_KEY:
+        return None
+    idx = _COALESCE_KEY[sql]
+    return sql, (None if idx is None else params[idx])
+
+
+# 连接级 PRAGMA：WAL + NORMAL 减少 fsync，64MB 页缓存/2GB mmap 让近期K线查询走内存
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=2147483648",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+# 仅对新建（空）数据库文件生效的 PRAGMA：自动清理在建表后无法再修改（除非 VACUUM），
+# 且必须在切换到 WAL 之前设置。页大小保持默认 4 KiB：本程序以每 tick 一次的小事务为主，
+# WAL 按整页写帧，64 KiB 页实测每次提交写入约 16 倍字节、耗时约 3.4 倍
+SQLITE_NEW_DB_PRAGMAS = (
+    "PRAGMA auto_vacuum=NONE",
+)
+
+
+def open_db(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """打开同步 sqlite3 连接并应用统一的 PRAGMA（供 Web 仪表盘与脚本使用）"""
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        for pragma in SQLITE_NEW_DB_PRAGMAS:
+            conn.execute(pragma)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+_SHARED_CONNS: dict[str, tuple] = {}  # path -> (连接, 可重入锁)
+_SHARED_CONNS_LOCK = threading.Lock()
+
+
+@contextmanager
+def shared_conn(path: str):
+    """进程内按路径复用同一个同步连接（Row 行工厂），跨线程以锁串行使用。
+    退出时与 `with conn:` 语义一致：正常提交，异常回滚；连接本身不关闭。
+    """
+    entry = _SHARED_CONNS.get(path)
+    if entry is None:
+        with _SHARED_CONNS_LOCK:
+            entry = _SHARED_CONNS.get(path)
+            if entry is None:
+                conn = open_db(path, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                entry = _SHARED_CONNS[path] = (conn, threading.RLock())
+    conn, lock = entry
+    with lock:
+        with conn:
+            yield conn
+
+
+@dataclass(slots=True)
+class KlineArrays:
+    """按列存放的一段K线（时间升序），可直接交给 Indicator.recompute_all"""
+    open_time: np.ndarray
+    close_time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    @classmethod
+    def from_rows(cls, rows) -> "KlineArrays":
+        """rows 为 (open_time, close_time, open, high, low, close, volume) 元组序列"""
+        n = len(rows)
+        cols = tuple(zip(*rows)) if n else ((),) * 7
+        ints = [np.fromiter(c, dtype=np.int64, count=n) for c in cols[:2]]
+        floats = [np.fromiter(c, dtype=np.float64, count=n) for c in cols[2:]]
+        return cls(*ints, *floats)
 
 
 class DB:
-    def __init__(self, path: str):
+    def __init__(self, path: str, readers: int = 2):
         self.path = path
+        self.readers = max(1, readers)
+        # 进程生命周期内复用的连接，init() 中建立：一个写连接（SQLite 同时只允许一个写者）+ 若干只读连接
+        self._write_conn: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+        self._read_conns: list[aiosqlite.Connection] = []
+        self._read_cycle = None
+        self._batch_owner: asyncio.Task | None = None  # 持有 batch() 事务的任务
+        # 后台写队列（start_writer() 后启用）：写方法只入队，由单个后台任务按批提交
+        self._write_q: asyncio.Queue | None = None
+        self._writer_task: asyncio.Task | None = None
+        self._retry: list = []  # 上一轮提交失败、待下一轮放在队首重试的写入
+        self._retry_rounds = 0
 
     async def init(self):
-        async with aiosqlite.connect(self.path) as db:
-            await db.executescript(INIT_SQL)
-            await db.commit()
-            logging.info("SQLite initialized")
+        self._write_conn = await aiosqlite.connect(self.path, cached_statements=_STMT_CACHE_SIZE)
+        async with self._write_conn.execute("PRAGMA page_count") as cursor:
+            (page_count,) = await cursor.fetchone()
+        if page_count == 0:
+            for pragma in SQLITE_NEW_DB_PRAGMAS:
+                await self._write_conn.execute(pragma)
+        for pragma in SQLITE_PRAGMAS:
+            await self._write_conn.execute(pragma)
+        await self._write_conn.executescript(INIT_SQL)
+        await self._write_conn.execute(_SQL_PRUNE_STATE)
+        await self._write_conn.commit()
+        # 只读连接需在建表之后打开（mode=ro 不会创建文件）；WAL 下读不阻塞写
+        for _ in range(self.readers):
+            conn = await aiosqlite.connect(f"file:{self.path}?mode=ro", uri=True, cached_statements=_STMT_CACHE_SIZE)
+            for pragma in SQLITE_PRAGMAS[2:]:  # journal_mode/synchronous 对只读连接无意义
+                await conn.execute(pragma)
+            self._read_conns.append(conn)
+        self._read_cycle = itertools.cycle(self._read_conns)
+        logging.info("SQLite initialized")
+
+    def start_writer(self, flush_ms: int = 50, max_batch: int = 256, maxsize: int = 10_000):
+        """启用后台写：之后的写方法只把 (sql, params) 放入队列立即返回，不再等待磁盘。
+        后台任务每 flush_ms 毫秒（或积压达到 max_batch 条时立即）把队列中的全部写入按原顺序
+        在一个事务内提交。队列满时写方法会等待（背压），不会丢数据。
+        信号/交易记录（_SYNC_SQL）不进队列，仍由调用方同步等待提交。
+        """
+        if self._writer_task is not None:
+            return
+        self._write_q = asyncio.Queue(maxsize=maxsize)
+        self._writer_task = asyncio.create_task(self._writer_loop(flush_ms / 1000.0, max_batch))
+
+    async def _writer_loop(self, flush_s: float, max_batch: int):
+        q = self._write_q
+        stop = False
+        while not stop:
+            if self._retry:
+                # 有待重试的写入：不阻塞等新数据，隔一个间隔后连同新入队的一起重试（失败项在前，保持原顺序）
+                items, self._retry = self._retry, []
+                await asyncio.sleep(flush_s)
+            else:
+                items = [await q.get()]
+                if q.qsize() + 1 < max_batch:
+                    await asyncio.sleep(flush_s)  # 攒一小段时间，合并为一次提交
+            while not q.empty():
+                items.append(q.get_nowait())
+            if None in items:  # close() 投递的结束标记
+                stop = True
+                items = [it for it in items if it is not None]
+            if items:
+                await self._flush(items)
+        if self._retry:  # 退出前对待重试的写入再提交一次
+            items, self._retry = self._retry, []
+            await self._flush(items)
+        if self._retry:
+            logging.error(f"关闭时仍有 {len(self._retry)} 条后台写入未能提交，已丢弃")
+            self._retry = []
+
+    async def _rollback(self):
+        """回滚写连接上未完成的事务。写连接长期复用，失败的写入若不回滚，隐式事务会一直挂着，
+        之后的 BEGIN/提交全部失败；回滚本身失败时只记日志，不能让后台写任务退出或掩盖原异常"""
+        try:
+            await self._write_conn.rollback()
+        except Exception as e:
+            logging.error(f"写连接回滚失败: {e}")
+
+    async def _flush(self, items):
+        """按入队顺序执行一批写入：连续的同一语句合并为 executemany，整批一个事务。
+        整批失败时退回逐条提交，单条坏数据不会连累其余写入；锁超时/磁盘错误时剩余写入放回队首，下一轮重试。
+        """
+        # 同一批内对同一行的覆盖写（盘中同一根K线的反复更新、状态单行）只保留最后一次，其余顺序不变
+        keys = [_coalesce_key(sql, params) for sql, params in items]
+        last = {key: i for i, key in enumerate(keys) if key is not None}
+        items = [it for i, (it, key) in enumerate(zip(items, keys)) if key is None or last[key] == i]
+        failed = []
+        async with self._write_lock:
+            try:
+                if self._write_conn.in_transaction:  # 防御：上一次失败遗留的事务
+                    await self._rollback()
+                await self._write_conn.execute("BEGIN IMMEDIATE")
+                for sql, group in itertools.groupby(items, key=lambda it: it[0]):
+                    await self._write_conn.executemany(sql, [params for _, params in group])
+                await self._write_conn.commit()
+            except sqlite3.OperationalError as e:
+                # 锁超时/磁盘错误等环境问题：逐条提交也会同样失败，整批留待下一轮
+                await self._rollback()
+                failed, err = items, e
+            except Exception as e:
+                await self._rollback()
+                logging.warning(f"后台批量写入失败，改为逐条提交 {len(items)} 条: {e}")
+                for i, (sql, params) in enumerate(items):
+                    try:
+                        await self._write_conn.execute(sql, params)
+                        await self._write_conn.commit()
+                    except sqlite3.OperationalError as e:
+                        # 同上：剩余写入整段留待下一轮，不再逐条等 busy_timeout
+                        await self._rollback()
+                        failed.extend(items[i:])
+                        err = e
+                        break
+                    except Exception as e:
+                        # 约束冲突等数据本身的问题，重试也不会成功：只丢弃这一条
+                        await self._rollback()
+                        logging.error(f"后台写入失败，丢弃 1 条 {params!r}: {e}")
+        if not failed:
+            self._retry_rounds = 0
+            return
+        self._retry_rounds += 1
+        if self._retry_rounds > _MAX_RETRY_ROUNDS:
+            logging.error(f"后台写入连续 {_MAX_RETRY_ROUNDS} 轮失败，丢弃 {len(failed)} 条: {err}")
+            self._retry_rounds = 0
+            return
+        logging.error(f"后台写入失败 {len(failed)} 条，下一轮重试（第 {self._retry_rounds} 次）: {err}")
+        self._retry = failed
+
+    async def close(self):
+        if self._writer_task is not None:
+            await self._write_q.put(None)  # 先把队列中剩余的写入提交完
+            await self._writer_task
+            self._writer_task = None
+            self._write_q = None
+        for conn in self._read_conns:
+            await conn.close()
+        self._read_conns.clear()
+        self._read_cycle = None
+        if self._write_conn is not None:
+            await self._write_conn.close()
+            self._write_conn = None
+
+    def _reader(self) -> aiosqlite.Connection:
+        """轮询取一个只读连接"""
+        return next(self._read_cycle)
+
+    async def _write(self, sql: str, params=()):
+        if self._write_q is not None and sql not in _SYNC_SQL:
+            await self._write_q.put((sql, params))  # 队列未满时不会让出事件循环
+            return
+        if self._batch_owner is not None and self._batch_owner is asyncio.current_task():
+            # 处于本任务的 batch() 事务中：只执行，由 batch 统一提交
+            await self._write_conn.execute(sql, params)
+            return
+        async with self._write_lock:
+            try:
+                await self._write_conn.execute(sql, params)
+                await self._write_conn.commit()
+            except BaseException:
+                await self._rollback()
+                raise
+
+    async def _write_many(self, sql: str, rows):
+        """executemany 批量写入，整批在一个事务内（已在 batch() 中时并入外层事务）"""
+        if self._write_q is not None:
+            for params in rows:
+                await self._write_q.put((sql, params))
+            return
+        async with self.batch():
+            await self._write_conn.executemany(sql, rows)
+
+    @asynccontextmanager
+    async def batch(self):
+        """把一组写操作合并为一个事务（一次 BEGIN IMMEDIATE / COMMIT），异常时回滚。
+        用法：async with db.batch(): await db.insert_kline(k); await db.save_strategy_state(...)
+        """
+        if self._write_q is not None or (self._batch_owner is not None and self._batch_owner is asyncio.current_task()):
+            yield  # 后台写已按批提交 / 已在本任务的事务中，直接并入
+            return
+        async with self._write_lock:
+            try:
+                if self._write_conn.in_transaction:  # 防御：上一次失败遗留的事务，否则 BEGIN 会一直失败
+                    await self._rollback()
+                await self._write_conn.execute("BEGIN IMMEDIATE")
+                self._batch_owner = asyncio.current_task()
+                yield
+            except BaseException:
+                await self._rollback()
+                raise
+            else:
+                await self._write_conn.commit()
+            finally:
+                self._batch_owner = None
 
     async def insert_kline(self, k):
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute(
-                "INSERT OR REPLACE INTO klines(open_time, close_time, open, high, low, close, volume, is_closed) VALUES (?,?,?,?,?,?,?,?)",
-                (k.open_time, k.close_time, k.open, k.high, k.low, k.close, k.volume, int(k.is_closed)),
-            )
-            await db.commit()
+        await self._write(_SQL_INSERT_KLINE, (k.open_time, k.close_time, k.open, k.high, k.low, k.close, k.volume, int(k.is_closed)))
+
+    async def insert_klines_bulk(self, ks) -> int:
+        """批量写入K线（INSERT OR REPLACE），返回条数"""
+        rows = [(k.open_time, k.close_time, k.open, k.high, k.low, k.close, k.volume, int(k.is_closed)) for k in ks]
+        if rows:
+            await self._write_many(_SQL_INSERT_KLINE, rows)
+        return len(rows)
 
     async def upsert_indicator(self, open_time: int, ma: float, std: float, up: float, dn: float):
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute(
-                "INSERT OR REPLACE INTO indicators(open_time, ma, std, up, dn) VALUES (?,?,?,?,?)",
-                (open_time, ma, std, up, dn),
-            )
-            await db.commit()
+        await self._write(_SQL_UPSERT_IND, (open_time, ma, std, up, dn))
+
+    async def upsert_indicators_bulk(self, rows) -> int:
+        """批量写入指标，rows 为 (open_time, ma, std, up, dn) 序列，返回条数"""
+        rows = list(rows)
+        if rows:
+            await self._write_many(_SQL_UPSERT_IND, rows)
+        return len(rows)
 
     async def log_signal(self, ts: int, signal: str, price: float):
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute(
-                "INSERT INTO signals(ts, signal, price) VALUES (?,?,?)",
-                (ts, signal, price),
-            )
-            await db.commit()
+        await self._write(_SQL_INSERT_SIGNAL, (ts, signal, price))
 
     async def log_trade(self, ts: int, side: str, qty: float, price: float | None, order_id: str | None, status: str | None):
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute(
-                "INSERT INTO trades(ts, side, qty, price, order_id, status) VALUES (?,?,?,?,?,?)",
-                (ts, side, qty, price, order_id, status),
-            )
-            await db.commit()
+        await self._write(_SQL_INSERT_TRADE, (ts, side, qty, price, order_id, status))
 
     async def log_error(self, ts: int, where_: str, error: str):
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute(
-                "INSERT INTO errors(ts, where_, error) VALUES (?,?,?)",
-                (ts, where_, error),
-            )
-            await db.commit()
+        await self._write(_SQL_INSERT_ERROR, (ts, where_, error))
 
     async def update_trade_status_on_close(self, close_side: str):
         """当平仓/止损发生时，将最近一条对应方向的开仓记录标记为 OVER。
@@ -122,79 +443,49 @@ class DB:
             open_sides = ("SELL", "SELL_OPEN")
         else:
             return
-        async with aiosqlite.connect(self.path) as db:
-            # 使用子查询选取最近一条未标记为OVER的开仓记录
-            await db.execute(
-                """
-                UPDATE trades
-                SET status = 'OVER'
-                WHERE id = (
-                    SELECT id FROM trades
-                    WHERE side IN (?, ?)
-                      AND (status IS NULL OR status <> 'OVER')
-                    ORDER BY ts DESC
-                    LIMIT 1
-                )
-                """,
-                open_sides,
-            )
-            await db.commit()
+        await self._write(_SQL_MARK_TRADE_OVER, open_sides)
 
     async def save_strategy_state(self, ts: int, position: str, pending: str = None, entry_price: float = None, breakout_level: float = None, breakout_up: bool = False, breakout_dn: bool = False, last_close_price: float = None):
         """保存策略状态"""
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute(
-                "INSERT INTO strategy_state(ts, position, pending, entry_price, breakout_level, breakout_up, breakout_dn, last_close_price) VALUES (?,?,?,?,?,?,?,?)",
-                (ts, position, pending, entry_price, breakout_level, int(breakout_up), int(breakout_dn), last_close_price),
-            )
-            await db.commit()
+        await self._write(_SQL_SAVE_STATE, (ts, position, pending, entry_price, breakout_level, int(breakout_up), int(breakout_dn), last_close_price))
 
     async def load_latest_strategy_state(self):
         """加载最新的策略状态"""
-        async with aiosqlite.connect(self.path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute(
-                "SELECT position, pending, entry_price, breakout_level, breakout_up, breakout_dn, last_close_price FROM strategy_state ORDER BY ts DESC LIMIT 1"
-            ) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return {
-                        'position': row['position'],
-                        'pending': row['pending'],
-                        'entry_price': row['entry_price'],
-                        'breakout_level': row['breakout_level'],
-                        'breakout_up': bool(row['breakout_up']) if row['breakout_up'] is not None else False,
-                        'breakout_dn': bool(row['breakout_dn']) if row['breakout_dn'] is not None else False,
-                        'last_close_price': row['last_close_price']
-                    }
-                return None
-
-    async def get_recent_klines(self, limit: int = 30):
-        """获取最近的K线数据，按时间升序返回"""
-        async with aiosqlite.connect(self.path) as db:
-            async with db.execute(
-                "SELECT open_time, close_time, open, high, low, close, volume FROM klines ORDER BY open_time DESC LIMIT ?",
-                (limit,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                # 返回升序排列的数据（最老的在前面）
-                return list(reversed(rows))
+        async with self._reader().execute(_SQL_LATEST_STATE) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        # 读连接统一返回元组（不设 row_factory），按 _SQL_LATEST_STATE 的列顺序解包
+        position, pending, entry_price, breakout_level, breakout_up, breakout_dn, last_close_price = row
+        return {
+            'position': position,
+            'pending': pending,
+            'entry_price': entry_price,
+            'breakout_level': breakout_level,
+            'breakout_up': bool(breakout_up) if breakout_up is not None else False,
+            'breakout_dn': bool(breakout_dn) if breakout_dn is not None else False,
+            'last_close_price': last_close_price
+        }
+
+    async def get_recent_klines(self, limit: int = 30) -> KlineArrays:
+        """获取最近的K线数据，按时间升序以列数组返回"""
+        async with self._reader().execute(_SQL_RECENT_KLINES, (limit,)) as cursor:
+            rows = await cursor.fetchall()
+        return KlineArrays.from_rows(rows)
 
     async def get_latest_closed_open_time(self):
         """返回数据库中最新一根已收盘K线的open_time，若不存在返回None"""
-        async with aiosqlite.connect(self.path) as db:
-            async with db.execute(
-                "SELECT open_time FROM klines WHERE is_closed=1 ORDER BY open_time DESC LIMIT 1"
-            ) as cursor:
-                row = await cursor.fetchone()
-                return int(row[0]) if row else None
+        async with self._reader().execute(_SQL_LATEST_CLOSED_OT) as cursor:
+            row = await cursor.fetchone()
+            return int(row[0]) if row else None
+
+    async def get_closed_open_times(self, start: int, end: int) -> set[int]:
+        """返回 [start, end] 区间内已收盘K线的 open_time 集合（走 idx_klines_closed_ot 部分索引）"""
+        async with self._reader().execute(_SQL_CLOSED_OT_RANGE, (start, end)) as cursor:
+            return {row[0] for row in await cursor.fetchall()}
 
     async def get_recent_closed_klines(self, limit: int = 30):
         """获取最近的已收盘K线数据，按时间升序返回"""
-        async with aiosqlite.connect(self.path) as db:
-            async with db.execute(
-                "SELECT open_time, close_time, open, high, low, close, volume FROM klines WHERE is_closed=1 ORDER BY open_time DESC LIMIT ?",
-                (limit,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return list(reversed(rows))
\ No newline at end of file
+        async with self._reader().execute(_SQL_RECENT_CLOSED_KLINES, (limit,)) as cursor:
+            rows = await cursor.fetchall()
+            return list(reversed(rows))
@@ -1,69 +1,233 @@
-import pandas as pd
+import math
+from collections import deque
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba 为可选依赖：缺失时按普通 Python 函数执行
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+@njit(cache=True)
+def rolling_boll(closes, window, multiplier, ddof):
+    """
+    滚动BOLL：维护窗口内的和与平方和，单次遍历 O(N) 得到每个位置的 ma/std/up/dn。
+    前 window-1 个位置数据不足，返回 NaN。数值先减去首个价格再累加，避免大价格平方带来的精度损失。
+    """
+    n = closes.shape[0]
+    ma = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    up = np.full(n, np.nan)
+    dn = np.full(n, np.nan)
+    if n < window or window <= ddof:
+        return ma, std, up, dn
+    shift = closes[0]
+    s = 0.0
+    s2 = 0.0
+    for i in range(n):
+        x = closes[i] - shift
+        s += x
+        s2 += x * x
+        if i >= window:
+            old = closes[i - window] - shift
+            s -= old
+            s2 -= old * old
+        if i >= window - 1:
+            mean = s / window
+            var = (s2 - s * mean) / (window - ddof)
+            if var < 0.0:
+                var = 0.0
+            sd = math.sqrt(var)
+            m = mean + shift
+            ma[i] = m
+            std[i] = sd
+            up[i] = m + multiplier * sd
+            dn[i] = m - multiplier * sd
+    return ma, std, up, dn
+
 
 class Indicator:
+    # K线字段 -> dtype；每个字段一个定长 NumPy 数组（SoA 环形缓冲区）
+    _FIELDS = (
+        ("open_time", np.int64), ("close_time", np.int64),
+        ("open", np.float64), ("high", np.float64), ("low", np.float64),
+        ("close", np.float64), ("volume", np.float64), ("is_closed", np.bool_),
+    )
+
     def __init__(self, window: int = 20, boll_multiplier: float = 2.0, boll_ddof: int = 0, max_rows: int = 200):
         self.window = window
         self.boll_multiplier = boll_multiplier
         self.boll_ddof = boll_ddof
         self.max_rows = max_rows
-        self.df = pd.DataFrame(columns=["open_time","close_time","open","high","low","close","volume","is_closed"]).astype({
-            "open_time":"int64","close_time":"int64","open":"float64","high":"float64","low":"float64","close":"float64","volume":"float64","is_closed":"bool"
-        })
+        # 预分配 max_rows 行，写满后覆盖最旧的一行：每个tick无内存分配/拷贝
+        self._cols = {name: np.zeros(max_rows, dtype=dt) for name, dt in self._FIELDS}
+        self._head = 0   # 下一行写入位置
+        self._count = 0  # 当前有效行数（<= max_rows）
+        self._closed = 0  # 缓冲区内已收盘行数
+        # BOLL窗口：缓冲区内最近 window 根已收盘收盘价（定长 deque）+ 增量维护的和/平方和。
+        # 累加前先减去参考价 _shift，避免大价格平方相减的精度损失
+        self._closed_closes: deque[float] = deque(maxlen=max(window, 1))
+        self._pushes = 0  # 累计入窗次数，用于定期精确重算
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
 
-    def add_kline(self, k) -> tuple[float|None, float|None, float|None, float|None]:
-        row = {
-            "open_time": k.open_time,
-            "close_time": k.close_time,
-            "open": k.open,
-            "high": k.high,
-            "low": k.low,
-            "close": k.close,
-            "volume": k.volume,
-            "is_closed": k.is_closed,
-        }
-        self.df.loc[len(self.df)] = row
-        # keep last N rows to bound memory
-        if len(self.df) > self.max_rows:
-            self.df = self.df.iloc[-self.max_rows:].reset_index(drop=True)
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def closed_count(self) -> int:
+        """缓冲区内已收盘K线的行数"""
+        return self._closed
+
+    def _win_pop_oldest(self):
+        x = self._closed_closes.popleft() - self._shift
+        self._sum -= x
+        self._sumsq -= x * x
+
+    def _win_push(self, close: float):
+        win = self._closed_closes
+        if not win:
+            self._shift = close
+            self._sum = self._sumsq = 0.0
+        elif len(win) == win.maxlen:
+            x = win[0] - self._shift  # 即将被 append 挤出的最旧值
+            self._sum -= x
+            self._sumsq -= x * x
+        win.append(close)
+        self._pushes += 1
+        if self._pushes % win.maxlen == 0:
+            # 每入窗 window 次按当前窗口精确重算一次，消除增量累加的漂移（均摊 O(1)）
+            self._shift = close
+            s = s2 = 0.0
+            for c in win:
+                x = c - close
+                s += x
+                s2 += x * x
+            self._sum, self._sumsq = s, s2
+        else:
+            x = close - self._shift
+            self._sum += x
+            self._sumsq += x * x
+
+    def _boll(self, s: float, s2: float, n: int) -> tuple[float, float]:
+        mean = s / n
+        var = (s2 - s * mean) / (n - self.boll_ddof) if n > self.boll_ddof else math.nan
+        return mean + self._shift, math.sqrt(max(var, 0.0)) if var == var else math.nan
+
+    def _append(self, k):
+        """写入一行到环形缓冲区，并同步维护BOLL窗口"""
+        i = self._head
+        cols = self._cols
+        # keep last N rows to bound memory：被覆盖的旧行若已收盘且仍在BOLL窗口内，同步移出窗口
+        if self._count == self.max_rows and cols["is_closed"][i]:
+            if self._closed <= len(self._closed_closes):
+                self._win_pop_oldest()
+            self._closed -= 1
+        cols["open_time"][i] = k.open_time
+        cols["close_time"][i] = k.close_time
+        cols["open"][i] = k.open
+        cols["high"][i] = k.high
+        cols["low"][i] = k.low
+        cols["close"][i] = k.close
+        cols["volume"][i] = k.volume
+        cols["is_closed"][i] = k.is_closed
+        self._head = (i + 1) % self.max_rows
+        if self._count < self.max_rows:
+            self._count += 1
         # 使用已收盘的K线来计算BOLL，保证与交易所一致
-        closed_df = self.df[self.df["is_closed"] == True]
-        if len(closed_df) < self.window:
+        if k.is_closed:
+            self._closed += 1
+            self._win_push(float(k.close))
+
+    def add_kline(self, k) -> tuple[float|None, float|None, float|None, float|None]:
+        self._append(k)
+        n = len(self._closed_closes)
+        if n < self.window:
             return None, None, None, None
-        closes = closed_df["close"].tail(self.window)
-        ma = closes.mean()
-        std = closes.std(ddof=self.boll_ddof)
+        ma, std = self._boll(self._sum, self._sumsq, n)
         up = ma + self.boll_multiplier * std
         dn = ma - self.boll_multiplier * std
         return ma, std, up, dn
 
+    def _ordered(self, name: str) -> np.ndarray:
+        """按时间先后返回某一列（未写满时为切片视图，写满后拼接两段）"""
+        col = self._cols[name]
+        if self._count < self.max_rows:
+            return col[:self._count]
+        return np.concatenate((col[self._head:], col[:self._head]))
+
+    def recompute_all(self, klines) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        启动回补用：把一段已收盘K线（列数组，时间升序，如 db.KlineArrays）整体写入缓冲区预热，
+        并用 rolling_boll 一次性算出每根K线对应的 ma/std/up/dn 数组（数据不足处为 NaN）。
+        """
+        n = len(klines)
+        closes = np.asarray(klines.close, dtype=np.float64)
+        # 超出容量的部分逐根写入也会被覆盖，只需写最后 m 行
+        m = min(n, self.max_rows)
+        if m:
+            pos = (self._head + np.arange(m)) % self.max_rows
+            for name, _ in self._FIELDS:
+                if name == "is_closed":
+                    self._cols[name][pos] = True
+                else:
+                    self._cols[name][pos] = getattr(klines, name)[n - m:]
+            self._head = (self._head + m) % self.max_rows
+            self._count = min(self._count + m, self.max_rows)
+            # 按缓冲区内容重建已收盘计数与BOLL窗口（精确重算和/平方和）
+            closed = np.compress(self._ordered("is_closed"), self._ordered("close"))
+            self._closed = len(closed)
+            self._closed_closes.clear()
+            self._pushes = 0
+            for c in closed[-self._closed_closes.maxlen:].tolist():
+                self._win_push(c)
+        if self.window > self.max_rows:
+            # 缓冲区装不下一个完整窗口，与逐根 add_kline 一致：全部视为数据不足
+            closes = np.full(n, np.nan)
+            return closes, closes.copy(), closes.copy(), closes.copy()
+        return rolling_boll(closes, self.window, float(self.boll_multiplier), self.boll_ddof)
+
     # === New: compute realtime BOLL using last window-1 closed closes + current forming close ===
     def compute_realtime_boll(self, current_close: float) -> tuple[float|None, float|None, float|None, float|None]:
         """
         返回基于"最近 window-1 根已收盘K线 + 当前形成中的最新价(current_close)"计算的实时BOLL。
         当已收盘K线数量不足时，尝试使用所有可用的已收盘K线 + 当前价格。
         """
-        closed_df = self.df[self.df["is_closed"] == True]
-        
         # 如果已收盘K线数量不足window，但至少有一些数据，仍然计算
-        if len(closed_df) == 0:
+        if not self._closed_closes:
             return None, None, None, None
         
-        # 使用所有可用的已收盘K线，但不超过window-1根
-        available_closes = min(len(closed_df), max(1, self.window - 1))
-        closes = list(closed_df["close"].tail(available_closes).astype(float)) + [float(current_close)]
+        # 使用所有可用的已收盘K线，但不超过window-1根：窗口已满时去掉最旧一根，再加入当前价格（不触碰数组）
+        s, s2, n = self._sum, self._sumsq, len(self._closed_closes)
+        if n > max(1, self.window - 1):
+            oldest = self._closed_closes[0] - self._shift
+            s -= oldest
+            s2 -= oldest * oldest
+            n -= 1
+        x = float(current_close) - self._shift
+        s += x
+        s2 += x * x
+        n += 1  # 此处 n >= 2
         
-        # 至少需要2个数据点才能计算标准差
-        if len(closes) < 2:
+        # 样本数不大于 ddof 时标准差无定义（NaN），返回None
+        if n <= self.boll_ddof:
             return None, None, None, None
             
-        s = pd.Series(closes, dtype="float64")
-        ma = s.mean()
-        std = s.std(ddof=self.boll_ddof)
+        # 单遍方差：负的舍入误差钳为0，结果必为有限值，无需再做 NaN 判断
+        mean = s / n
+        var = (s2 - s * mean) / (n - self.boll_ddof)
+        ma = mean + self._shift
+        std = math.sqrt(var) if var > 0.0 else 0.0
         
-        # 如果标准差为0或NaN，返回None
-        if pd.isna(std) or std == 0:
+        # 如果标准差为0，返回None（增量和存在舍入误差，按价格量级的相对阈值视为0）
+        if std <= 1e-9 * abs(ma):
             return None, None, None, None
             
         up = ma + self.boll_multiplier * std
         dn = ma - self.boll_multiplier * std
-        return float(ma), float(std), float(up), float(dn)
\ No newline at end of file
+        return ma, std, up, dn
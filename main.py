@@ -1,12 +1,25 @@
 import asyncio
+import functools
 import logging
 import os
+import re
 import time
 from datetime import datetime
 import json
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
 
-import pytz
+try:
+    import aiohttp  # python-binance 已依赖 aiohttp；缺失时 REST 回补退回 urllib + 线程
+except ImportError:
+    aiohttp = None
+
+try:
+    import orjson  # 可选：REST 响应直接从 bytes 解析，缺失时用标准库 json
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 from config import load_config
 from db import DB
@@ -17,37 +30,33 @@ from trader import Trader
 from webapp import start_web_server  # 新增
 
 
+# .env 中的 KEY=VALUE 行（允许 shell 风格的 export 前缀）：一次正则扫描整个文件；键/值两侧空白已剥离，'#' 开头的注释行不会匹配
+_ENV_LINE_RE = re.compile(r"^[^\S\n]*(?:export[^\S\n]+)?([^#\s=][^=\n]*?)[^\S\n]*=[^\S\n]*(.*?)[^\S\n]*$", re.M)
+
+
 def _load_env_file(path: str = ".env") -> None:
     """Lightweight .env loader without external deps.
     - Lines starting with '#' are ignored
-    - Supports KEY=VALUE with optional surrounding quotes
+    - Supports KEY=VALUE with optional surrounding quotes and an optional `export ` prefix
     - Doesn't overwrite existing environment variables
     """
     try:
-        if not os.path.exists(path):
-            return
         with open(path, "r", encoding="utf-8") as f:
-            for raw in f:
-                line = raw.strip()
-                if not line or line.startswith("#"):
-                    continue
-                if "=" not in line:
-                    continue
-                k, v = line.split("=", 1)
-                k = k.strip()
-                v = v.strip()
-                # strip inline comments that are preceded by whitespace
-                if " #" in v:
-                    v = v.split(" #", 1)[0].rstrip()
-                # remove surrounding quotes if present
-                if (v.startswith("\"") and v.endswith("\"")) or (v.startswith("'") and v.endswith("'")):
-                    v = v[1:-1]
-                # do not override pre-set env vars
-                if k and (k not in os.environ):
-                    os.environ[k] = v
+            text = f.read()
     except Exception:
         # fail silently; fall back to defaults/env
-        pass
+        return
+    environ = os.environ
+    for k, v in _ENV_LINE_RE.findall(text):
+        # strip inline comments that are preceded by whitespace
+        if " #" in v:
+            v = v.split(" #", 1)[0].rstrip()
+        # remove surrounding quotes if present
+        if (v.startswith("\"") and v.endswith("\"")) or (v.startswith("'") and v.endswith("'")):
+            v = v[1:-1]
+        # do not override pre-set env vars
+        if k not in environ:
+            environ[k] = v
 
 
 def _interval_to_ms(interval: str) -> int:
@@ -65,51 +74,81 @@ def _interval_to_ms(interval: str) -> int:
         return 15 * 60_000
 
 
+def _parse_rest_klines(data, interval: str) -> list[KlineEvent]:
+    """把 /fapi/v1/klines 返回的二维数组转换为 KlineEvent 列表"""
+    now_ms = time.time_ns() // 1_000_000
+    interval_ms = _interval_to_ms(interval)
+    out = []
+    for it in data:
+        ot = int(it[0])
+        ct = int(it[6]) if len(it) > 6 else (ot + interval_ms - 1)
+        is_closed = now_ms >= ct
+        out.append(KlineEvent(ot, ct, float(it[1]), float(it[2]), float(it[3]), float(it[4]), float(it[5]), is_closed))
+    return out
+
+
+def _klines_url(rest_base: str, symbol: str, interval: str, limit: int) -> str:
+    return f"{rest_base.rstrip('/')}/fapi/v1/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}"
+
+
 def _fetch_recent_klines_rest(rest_base: str, symbol: str, interval: str, limit: int = 300):
-    url = f"{rest_base.rstrip('/')}/fapi/v1/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}"
+    url = _klines_url(rest_base, symbol, interval, limit)
     try:
         with urllib.request.urlopen(url, timeout=5) as resp:
             if resp.status != 200:
                 return []
-            data = json.loads(resp.read().decode('utf-8'))
-            now_ms = int(time.time() * 1000)
-            interval_ms = _interval_to_ms(interval)
-            out = []
-            for it in data:
-                ot = int(it[0])
-                ct = int(it[6]) if len(it) > 6 else (ot + interval_ms - 1)
-                is_closed = now_ms >= ct
-                out.append(KlineEvent(
-                    open_time=ot,
-                    close_time=ct,
-                    open=float(it[1]),
-                    high=float(it[2]),
-                    low=float(it[3]),
-                    close=float(it[4]),
-                    volume=float(it[5]),
-                    is_closed=is_closed
-                ))
-            return out
+            data = _json_loads(resp.read())
+            return _parse_rest_klines(data, interval)
     except Exception:
         return []
 
 
+async def _fetch_recent_klines_rest_async(rest_base: str, symbol: str, interval: str, limit: int = 300):
+    """异步版本：请求期间不阻塞事件循环；无 aiohttp 时在线程中执行同步版本"""
+    if aiohttp is None:
+        return await asyncio.to_thread(_fetch_recent_klines_rest, rest_base, symbol, interval, limit)
+    url = _klines_url(rest_base, symbol, interval, limit)
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+            async with session.get(url) as resp:
+                if resp.status != 200:
+                    return []
+                data = _json_loads(await resp.read())
+        return _parse_rest_klines(data, interval)
+    except Exception:
+        return []
+
+
+async def _in_thread(pool: ThreadPoolExecutor, fn, *args, **kwargs):
+    """在线程池中执行阻塞调用（币安 REST），不阻塞事件循环（WS 心跳/其他任务照常运行）"""
+    return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+
 async def _backfill_recent_closed_klines(db: DB, cfg) -> int:
     """从REST拉取最近一段K线，补齐DB缺失记录；返回写入条数"""
-    klines = _fetch_recent_klines_rest(cfg.rest_base, cfg.symbol, cfg.interval, limit=300)
+    klines = await _fetch_recent_klines_rest_async(cfg.rest_base, cfg.symbol, cfg.interval, limit=300)
     if not klines:
         return 0
-    written = 0
-    for k in klines:
-        try:
-            await db.insert_kline(k)
-            written += 1
-        except Exception:
-            continue
-    logging.info(f"REST回补K线完成，共写入 {written} 条（含覆盖）")
+    # 库中已收盘的K线不会再变化，跳过；缺失的、以及上次停机时尚未收盘的K线照常写入
+    have = await db.get_closed_open_times(klines[0].open_time, klines[-1].open_time)
+    fetched = len(klines)
+    klines = [k for k in klines if not (k.is_closed and k.open_time in have)]
+    written = await db.insert_klines_bulk(klines)
+    logging.info(f"REST回补K线完成，共写入 {written} 条（已存在跳过 {fetched - written} 条）")
     return written
 
 
+# 信号 -> (平仓记录side, 开仓记录side, 开仓下单方向, 日志描述)；None 表示不执行该步骤
+_SIGNAL_PLAN = {
+    "open_short": (None, "SELL", "SELL", "开空仓"),
+    "open_long": (None, "BUY", "BUY", "开多仓"),
+    "close_short_open_long": ("BUY_CLOSE", "BUY_OPEN", "BUY", "平空开多"),
+    "close_long_open_short": ("SELL_CLOSE", "SELL_OPEN", "SELL", "平多开空"),
+    "stop_loss_short": ("BUY_STOP_LOSS", None, None, "空仓止损"),
+    "stop_loss_long": ("SELL_STOP_LOSS", None, None, "多仓止损"),
+}
+
+
 async def main():
     # Ensure .env variables are loaded before reading config
     _load_env_file()
@@ -121,9 +160,11 @@ async def main():
     
     # 创建自定义的时间格式化器，使用 UTC+8 时区
     class UTC8Formatter(logging.Formatter):
+        _tz = ZoneInfo('Asia/Shanghai')  # 只解析一次时区
+
         def formatTime(self, record, datefmt=None):
             # 使用 UTC+8 时区格式化时间
-            dt = datetime.fromtimestamp(record.created, tz=pytz.timezone('Asia/Shanghai'))
+            dt = datetime.fromtimestamp(record.created, tz=self._tz)
             if datefmt:
                 return dt.strftime(datefmt)
             else:
@@ -146,9 +187,6 @@ async def main():
     root_logger.addHandler(console_handler)
     logging.info(f"Starting with config: symbol={cfg.symbol}, interval={cfg.interval}")
 
-    # tz
-    tz = pytz.timezone(cfg.tz)
-
     # db
     db = DB(cfg.db_path)
     await db.init()
@@ -165,7 +203,8 @@ async def main():
                      http_timeout=cfg.http_timeout,
                      qty_precision=cfg.qty_precision,
                      price_round=cfg.price_round,
-                     stop_loss_working_type=cfg.stop_loss_working_type)
+                     stop_loss_working_type=cfg.stop_loss_working_type,
+                     position_ttl=cfg.position_ttl)
     if cfg.api_key and cfg.api_secret:
         trader.apply_leverage(cfg.symbol, cfg.leverage)
 
@@ -181,24 +220,14 @@ async def main():
     
     # 从数据库加载历史K线数据到indicators，并回填指标到数据库（仅已收盘K线）
     historical_klines = await db.get_recent_klines(cfg.window + 50)  # 多加载一些数据确保足够
-    backfill_cnt = 0
-    for kline_data in historical_klines:
-        # 创建KlineEvent对象（历史数据均视为已收盘）
-        k = KlineEvent(
-            open_time=kline_data[0],
-            close_time=kline_data[1], 
-            open=kline_data[2],
-            high=kline_data[3],
-            low=kline_data[4],
-            close=kline_data[5],
-            volume=kline_data[6],
-            is_closed=True
-        )
-        ma, std, up, dn = ind.add_kline(k)
-        if ma is not None:
-            # 回填该已收盘K线的指标
-            await db.upsert_indicator(k.open_time, ma, std, up, dn)
-            backfill_cnt += 1
+    # 历史数据均视为已收盘：列数组一次性预热指标并向量化计算整段BOLL
+    mas, stds, ups, dns = ind.recompute_all(historical_klines)
+    # 回填已收盘K线的指标（跳过数据不足处的 NaN），一次 executemany 写入
+    backfill_cnt = await db.upsert_indicators_bulk(
+        row
+        for row in zip(historical_klines.open_time.tolist(), mas.tolist(), stds.tolist(), ups.tolist(), dns.tolist())
+        if row[1] == row[1]
+    )
     logging.info(f"Loaded {len(historical_klines)} historical klines into indicators, backfilled {backfill_cnt} indicators")
 
     # ws
@@ -207,42 +236,115 @@ async def main():
                   ping_timeout=cfg.ws_ping_timeout,
                   backoff_initial=cfg.ws_backoff_initial,
                   backoff_max=cfg.ws_backoff_max,
-                  open_timeout=getattr(cfg, 'ws_open_timeout', 20))
+                  open_timeout=getattr(cfg, 'ws_open_timeout', 20),
+                  fast_recv=True)
 
     state = StrategyState()
     # 从数据库加载最新的策略状态
     latest_state = await db.load_latest_strategy_state()
     state.load_from_dict(latest_state)
     logging.info(f"Loaded strategy state: position={state.position}, pending={state.pending}, entry_price={state.entry_price}")
+    # 最近一次写入数据库的状态；未变化的tick不再重写 strategy_state
+    saved_state = state.snapshot() if latest_state else None
+
+    # 启动阶段的回补已同步落库；进入实时阶段后写入改走后台队列，on_kline 不再等待磁盘
+    if cfg.db_flush_ms > 0:
+        db.start_writer(cfg.db_flush_ms)
+
+    # cfg 为不可变配置：热路径用到的字段在此绑定为局部名，避免每个tick重复属性查找
+    symbol = cfg.symbol
+    sim = cfg.simulate_trading
+    have_keys = bool(cfg.api_key and cfg.api_secret)
+    max_pct = cfg.max_position_pct
+    sim_balance = cfg.simulate_balance
+    sl_enabled = cfg.stop_loss_enabled
+    sl_pct = cfg.stop_loss_pct
+    only_on_close = cfg.only_on_close
+    use_breakout_level_for_entry = cfg.use_breakout_level_for_entry
+    reentry_buffer_pct = cfg.reentry_buffer_pct
+    debug_on = logging.getLogger().isEnabledFor(logging.DEBUG)
+    log_trade = db.log_trade
+    mark_over = db.update_trade_status_on_close
+    # 同步的 python-binance 调用放到专用线程池执行；WS 回调逐条 await，tick 之间仍然串行
+    rest_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="binance-rest")
+
+    async def sim_execute(plan, price, ts_ms):
+        close_side, open_log_side, open_side, label = plan
+        if close_side:
+            await log_trade(ts_ms, close_side, 0, price, "SIMULATED", "FILLED")
+            await mark_over(close_side)
+        if open_side:
+            qty = sim_balance * max_pct / price  # 模拟计算数量
+            await log_trade(ts_ms, open_log_side, qty, price, "SIMULATED", "FILLED")
+            logging.info("模拟%s: %.3f @ %s", label, qty, price)
+        else:
+            logging.info("模拟%s @ %s", label, price)
+
+    async def real_execute(plan, price, ts_ms):
+        close_side, open_log_side, open_side, _ = plan
+        qty = None
+        if close_side:
+            # 市价全部平仓；平仓未成功时不再开反向仓
+            close = await _in_thread(rest_pool, trader.close_all_position, symbol)
+            if not close:
+                return
+
+            async def record_close():
+                await log_trade(ts_ms, close_side, 0, price, str(close.get("orderId")), close.get("status"))
+                await mark_over(close_side)
+
+            if open_side:
+                # 可用余额须在平仓后查询（保证金已释放）；平仓记录落库与之互不依赖，同时进行
+                _, qty = await asyncio.gather(record_close(), _in_thread(rest_pool, trader.calc_qty, symbol, price, max_pct))
+            else:
+                await record_close()
+        if open_side:
+            if qty is None:
+                qty = await _in_thread(rest_pool, trader.calc_qty, symbol, price, max_pct)
+            if qty > 0:
+                order = await _in_thread(rest_pool, trader.place_market, symbol, side=open_side, qty=qty)
+                record_open = log_trade(ts_ms, open_log_side, qty, price, str(order.get("orderId")), order.get("status"))
+                # state已在strategy.py中更新
+                if sl_enabled:
+                    # 止损单与开仓记录落库并发
+                    position = "long" if open_side == "BUY" else "short"
+                    await asyncio.gather(record_open, _in_thread(rest_pool, trader.place_stop_loss, symbol, position=position, entry_price=price, stop_loss_pct=sl_pct))
+                else:
+                    await record_open
 
     async def on_kline(k: KlineEvent):
-        # persist kline
-        await db.insert_kline(k)
+        nonlocal saved_state
+        ts_ms = time.time_ns() // 1_000_000  # 本tick统一时间戳（信号/交易/状态）
+        price = k.close  # 本tick多次用到的字段绑定为局部名
+        is_closed = k.is_closed
         ma, std, up, dn = ind.add_kline(k)
-        # 仅在K线收盘时写入指标，并以该已收盘K线的open_time入库，保证与交易所时间同步
-        if k.is_closed and (ma is not None):
-            await db.upsert_indicator(k.open_time, ma, std, up, dn)
 
         # 计算"实时BOLL"：最近 window-1 根已收盘 + 当前形成中的最新价(k.close)
-        rt_ma, rt_std, rt_up, rt_dn = ind.compute_realtime_boll(k.close)
+        rt_ma, rt_std, rt_up, rt_dn = ind.compute_realtime_boll(price)
 
         # 检查是否有足够的K线数据（至少支持实时BOLL计算）才执行交易
         if rt_up is None or rt_dn is None:
-            logging.info(f"等待更多K线数据以计算实时BOLL… 当前: {len(ind.df)} 行, 已收盘: {len(ind.df[ind.df['is_closed']==True])} 行")
+            if is_closed:  # 每根K线只提示一次，盘中tick不重复刷日志
+                logging.info("等待更多K线数据以计算实时BOLL… 当前: %d 行, 已收盘: %d 行", len(ind), ind.closed_count)
+            async with db.batch():
+                await db.insert_kline(k)
+                if is_closed and (ma is not None):
+                    await db.upsert_indicator(k.open_time, ma, std, up, dn)
             return
 
-        # 添加调试信息：每10根K线输出一次BOLL值和价格对比
-        if len(ind.df) % 10 == 0 or not k.is_closed:
-            logging.info(f"📊 BOLL调试 - 价格: {k.close:.2f}, UP: {rt_up:.2f}, DN: {rt_dn:.2f}, 状态: {state.position}, 等待: {state.pending}")
+        # 添加调试信息：每10根K线以 INFO 输出一次BOLL值和价格对比，盘中逐tick的仅在 DEBUG 级别输出
+        if is_closed and len(ind) % 10 == 0:
+            logging.info("📊 BOLL调试 - 价格: %.2f, UP: %.2f, DN: %.2f, 状态: %s, 等待: %s", price, rt_up, rt_dn, state.position, state.pending)
+        elif not is_closed and debug_on:
+            logging.debug("📊 BOLL调试 - 价格: %.2f, UP: %.2f, DN: %.2f, 状态: %s, 等待: %s", price, rt_up, rt_dn, state.position, state.pending)
 
         # 不再提前返回，而是将only_on_close/is_closed传入策略，由策略决定是否产生交易信号；
         # 这样在未收盘时也能更新pending/突破状态并保存，供仪表盘展示
-        price = k.close
 
         # 在非模拟模式下从币安API获取实际仓位，确保交易决策基于真实仓位
-        if (not cfg.simulate_trading) and cfg.api_key and cfg.api_secret:
+        if (not sim) and have_keys:
             try:
-                actual_position = trader.get_position_info(cfg.symbol)
+                actual_position = await _in_thread(rest_pool, trader.get_position_info, symbol)
                 if actual_position is not None:
                     # 有仓位，更新本地状态
                     state.position = actual_position["position_side"]
@@ -250,147 +352,63 @@ async def main():
                     # 无仓位
                     state.position = "flat"
             except Exception as e:
-                logging.warning(f"获取仓位信息失败: {e}")
+                logging.warning("获取仓位信息失败: %s", e)
                 # 继续执行策略逻辑，使用本地状态
 
-        # 确保布林带指标有效才进行策略决策
-        if rt_up is not None and rt_dn is not None:
-            signal = decide(price, rt_up, rt_dn, state,
-                             high_price=k.high, low_price=k.low,
-                             is_closed=k.is_closed, only_on_close=cfg.only_on_close,
-                             use_breakout_level_for_entry=getattr(cfg, 'use_breakout_level_for_entry', False),
-                             reentry_buffer_pct=getattr(cfg, 'reentry_buffer_pct', 0.0))
-            if signal:
-                await db.log_signal(int(time.time()*1000), signal, price)
-                logging.info(f"Signal: {signal} @ {price} (RT_UP={rt_up:.2f}, RT_DN={rt_dn:.2f})")
-
-                # 模拟交易模式：只记录交易信号，不执行真实交易
-                if cfg.simulate_trading:
-                    logging.info(f"模拟交易模式 - 信号: {signal} @ {price}")
-                    try:
-                        if signal == "open_short":
-                            qty = cfg.simulate_balance * cfg.max_position_pct / price  # 模拟计算数量
-                            await db.log_trade(int(time.time()*1000), "SELL", qty, price, "SIMULATED", "FILLED")
-                            logging.info(f"模拟开空仓: {qty:.3f} @ {price}")
-                        elif signal == "open_long":
-                            qty = cfg.simulate_balance * cfg.max_position_pct / price  # 模拟计算数量
-                            await db.log_trade(int(time.time()*1000), "BUY", qty, price, "SIMULATED", "FILLED")
-                            logging.info(f"模拟开多仓: {qty:.3f} @ {price}")
-                        elif signal == "close_short_open_long":
-                            # 模拟平空仓+开多仓
-                            await db.log_trade(int(time.time()*1000), "BUY_CLOSE", 0, price, "SIMULATED", "FILLED")
-                            await db.update_trade_status_on_close("BUY_CLOSE")
-                            qty = cfg.simulate_balance * cfg.max_position_pct / price
-                            await db.log_trade(int(time.time()*1000), "BUY_OPEN", qty, price, "SIMULATED", "FILLED")
-                            logging.info(f"模拟平空开多: {qty:.3f} @ {price}")
-                        elif signal == "close_long_open_short":
-                            # 模拟平多仓+开空仓
-                            await db.log_trade(int(time.time()*1000), "SELL_CLOSE", 0, price, "SIMULATED", "FILLED")
-                            await db.update_trade_status_on_close("SELL_CLOSE")
-                            qty = cfg.simulate_balance * cfg.max_position_pct / price
-                            await db.log_trade(int(time.time()*1000), "SELL_OPEN", qty, price, "SIMULATED", "FILLED")
-                            logging.info(f"模拟平空开空: {qty:.3f} @ {price}")
-                        elif signal == "stop_loss_short":
-                            # 模拟空仓止损
-                            await db.log_trade(int(time.time()*1000), "BUY_STOP_LOSS", 0, price, "SIMULATED", "FILLED")
-                            await db.update_trade_status_on_close("BUY_STOP_LOSS")
-                            logging.info(f"模拟空仓止损 @ {price}")
-                        elif signal == "stop_loss_long":
-                            # 模拟多仓止损
-                            await db.log_trade(int(time.time()*1000), "SELL_STOP_LOSS", 0, price, "SIMULATED", "FILLED")
-                            await db.update_trade_status_on_close("SELL_STOP_LOSS")
-                            logging.info(f"模拟多仓止损 @ {price}")
-                    except Exception as e:
-                        logging.error(f"模拟交易记录失败: {e}")
-                    return
-
-                if not (cfg.api_key and cfg.api_secret):
-                    return
-
-                # 真实交易模式
+        # 确保布林带指标有效才进行策略决策（上方已保证 rt_up/rt_dn 非空）
+        signal = decide(price, rt_up, rt_dn, state,
+                         high_price=k.high, low_price=k.low,
+                         is_closed=is_closed, only_on_close=only_on_close,
+                         use_breakout_level_for_entry=use_breakout_level_for_entry,
+                         reentry_buffer_pct=reentry_buffer_pct)
+        if signal:
+            await db.log_signal(ts_ms, signal, price)
+            logging.info("Signal: %s @ %s (RT_UP=%.2f, RT_DN=%.2f)", signal, price, rt_up, rt_dn)
+
+            plan = _SIGNAL_PLAN.get(signal)
+            # 模拟交易模式：只记录交易信号，不执行真实交易
+            if sim:
+                logging.info("模拟交易模式 - 信号: %s @ %s", signal, price)
                 try:
-                    if signal == "open_short":
-                        qty = trader.calc_qty(cfg.symbol, price, cfg.max_position_pct)
-                        if qty > 0:
-                            order = trader.place_market(cfg.symbol, side="SELL", qty=qty)
-                            await db.log_trade(int(time.time()*1000), "SELL", qty, price, str(order.get("orderId")), order.get("status"))
-                            # state已在strategy.py中更新
-                            if cfg.stop_loss_enabled:
-                                trader.place_stop_loss(cfg.symbol, position="short", entry_price=price, stop_loss_pct=cfg.stop_loss_pct)
-                    elif signal == "open_long":
-                        qty = trader.calc_qty(cfg.symbol, price, cfg.max_position_pct)
-                        if qty > 0:
-                            order = trader.place_market(cfg.symbol, side="BUY", qty=qty)
-                            await db.log_trade(int(time.time()*1000), "BUY", qty, price, str(order.get("orderId")), order.get("status"))
-                            # state已在strategy.py中更新
-                            if cfg.stop_loss_enabled:
-                                trader.place_stop_loss(cfg.symbol, position="long", entry_price=price, stop_loss_pct=cfg.stop_loss_pct)
-                    elif signal == "close_short_open_long":
-                        # 平空仓+开多仓
-                        # Close all short position using market close all
-                        close = trader.close_all_position(cfg.symbol)
-                        if close:
-                            await db.log_trade(int(time.time()*1000), "BUY_CLOSE", 0, price, str(close.get("orderId")), close.get("status"))
-                            await db.update_trade_status_on_close("BUY_CLOSE")
-                            qty = trader.calc_qty(cfg.symbol, price, cfg.max_position_pct)
-                            if qty > 0:
-                                open_ = trader.place_market(cfg.symbol, side="BUY", qty=qty)
-                                await db.log_trade(int(time.time()*1000), "BUY_OPEN", qty, price, str(open_.get("orderId")), open_.get("status"))
-                                # state已在strategy.py中更新
-                                if cfg.stop_loss_enabled:
-                                    trader.place_stop_loss(cfg.symbol, position="long", entry_price=price, stop_loss_pct=cfg.stop_loss_pct)
-                    elif signal == "close_long_open_short":
-                        # 平多仓+开空仓
-                        # Close all long position using market close all
-                        close = trader.close_all_position(cfg.symbol)
-                        if close:
-                            await db.log_trade(int(time.time()*1000), "SELL_CLOSE", 0, price, str(close.get("orderId")), close.get("status"))
-                            await db.update_trade_status_on_close("SELL_CLOSE")
-                            qty = trader.calc_qty(cfg.symbol, price, cfg.max_position_pct)
-                            if qty > 0:
-                                open_ = trader.place_market(cfg.symbol, side="SELL", qty=qty)
-                                await db.log_trade(int(time.time()*1000), "SELL_OPEN", qty, price, str(open_.get("orderId")), open_.get("status"))
-                                # state已在strategy.py中更新
-                                if cfg.stop_loss_enabled:
-                                    trader.place_stop_loss(cfg.symbol, position="short", entry_price=price, stop_loss_pct=cfg.stop_loss_pct)
-                    elif signal == "stop_loss_short":
-                        # 空仓止损
-                        # Close all short position using market close all
-                        order = trader.close_all_position(cfg.symbol)
-                        if order:
-                            await db.log_trade(int(time.time()*1000), "BUY_STOP_LOSS", 0, price, str(order.get("orderId")), order.get("status"))
-                            await db.update_trade_status_on_close("BUY_STOP_LOSS")
-                            # state已在strategy.py中更新为flat
-                    elif signal == "stop_loss_long":
-                        # 多仓止损
-                        # Close all long position using market close all
-                        order = trader.close_all_position(cfg.symbol)
-                        if order:
-                            await db.log_trade(int(time.time()*1000), "SELL_STOP_LOSS", 0, price, str(order.get("orderId")), order.get("status"))
-                            await db.update_trade_status_on_close("SELL_STOP_LOSS")
-                            # state已在strategy.py中更新为flat
+                    if plan:
+                        await sim_execute(plan, price, ts_ms)
                 except Exception as e:
-                    logging.error(f"order failed: {e}")
-                    await db.log_error(int(time.time()*1000), "order", str(e))
-        else:
-            logging.debug(f"实时BOLL未就绪，跳过策略决策 (RT_UP={rt_up}, RT_DN={rt_dn})")
+                    logging.error("模拟交易记录失败: %s", e)
+
+            # 真实交易模式
+            elif have_keys:
+                try:
+                    if plan:
+                        await real_execute(plan, price, ts_ms)
+                except Exception as e:
+                    logging.error("order failed: %s", e)
+                    await db.log_error(ts_ms, "order", str(e))
         
-        # 保存策略状态
-        await db.save_strategy_state(
-            int(time.time()*1000), 
-            state.position, 
-            state.pending, 
-            state.entry_price, 
-            state.breakout_level,
-            state.breakout_up,
-            state.breakout_dn,
-            state.last_close_price
-        )
+        # K线/指标与策略状态在同一事务内提交：每个tick只提交一次（有信号的tick同样落库）
+        snap = state.snapshot()
+        async with db.batch():
+            await db.insert_kline(k)
+            # 仅在K线收盘时写入指标，并以该已收盘K线的open_time入库，保证与交易所时间同步
+            if is_closed and (ma is not None):
+                await db.upsert_indicator(k.open_time, ma, std, up, dn)
+            # 保存策略状态：单行快照，内容未变化时跳过（ts 只用于排序，不必每个tick刷新）
+            if snap != saved_state:
+                await db.save_strategy_state(ts_ms, *snap)
+                saved_state = snap
 
-    await ws.connect_and_listen(on_kline)
+    try:
+        await ws.connect_and_listen(on_kline)
+    finally:
+        rest_pool.shutdown(wait=False)
+        await db.close()
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop  # 可选：libuv 事件循环，降低每条WS消息的调度开销
+        uvloop.install()
+    except ImportError:
+        pass
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -2,71 +2,73 @@
 """
 数据库迁移脚本：添加新的策略状态字段
 """
-import sqlite3
 import sys
 import os
 
+from db import open_db
+
+# strategy_state 需要补齐的字段：(字段名, 类型定义)
+_NEW_COLUMNS = (
+    ("breakout_up", "INTEGER DEFAULT 0"),
+    ("breakout_dn", "INTEGER DEFAULT 0"),
+    ("last_close_price", "REAL"),
+)
+
+
 def migrate_database(db_path: str):
     """迁移数据库，添加新的字段"""
-    print(f"开始迁移数据库: {db_path}")
+    # 进度信息先收集到缓冲区，结束时一次性写出
+    out = [f"开始迁移数据库: {db_path}\n"]
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = open_db(db_path)
         cursor = conn.cursor()
         
         # 检查strategy_state表是否存在
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='strategy_state'")
         if not cursor.fetchone():
-            print("错误: strategy_state表不存在，请先运行主程序创建表结构")
+            out.append("错误: strategy_state表不存在，请先运行主程序创建表结构\n")
             sys.exit(1)
         
         # 检查字段是否已存在
         cursor.execute("PRAGMA table_info(strategy_state)")
         columns = [row[1] for row in cursor.fetchall()]
-        print(f"当前字段: {columns}")
+        out.append(f"当前字段: {columns}\n")
         
         changes_made = False
         
-        # 添加新字段
-        if 'breakout_up' not in columns:
-            print("添加 breakout_up 字段...")
-            cursor.execute("ALTER TABLE strategy_state ADD COLUMN breakout_up INTEGER DEFAULT 0")
-            changes_made = True
-        else:
-            print("breakout_up 字段已存在")
+        # 所有 ALTER 放在同一个显式事务中，只提交（fsync）一次
+        cursor.execute("BEGIN IMMEDIATE")
         
-        if 'breakout_dn' not in columns:
-            print("添加 breakout_dn 字段...")
-            cursor.execute("ALTER TABLE strategy_state ADD COLUMN breakout_dn INTEGER DEFAULT 0")
-            changes_made = True
-        else:
-            print("breakout_dn 字段已存在")
-        
-        if 'last_close_price' not in columns:
-            print("添加 last_close_price 字段...")
-            cursor.execute("ALTER TABLE strategy_state ADD COLUMN last_close_price REAL")
-            changes_made = True
-        else:
-            print("last_close_price 字段已存在")
+        # 添加新字段
+        for name, ddl in _NEW_COLUMNS:
+            if name not in columns:
+                out.append(f"添加 {name} 字段...\n")
+                cursor.execute(f"ALTER TABLE strategy_state ADD COLUMN {name} {ddl}")
+                changes_made = True
+            else:
+                out.append(f"{name} 字段已存在\n")
         
         if changes_made:
             conn.commit()
-            print("数据库迁移完成!")
+            out.append("数据库迁移完成!\n")
         else:
-            print("所有字段都已存在，无需迁移")
+            out.append("所有字段都已存在，无需迁移\n")
         
         # 验证迁移结果
         cursor.execute("PRAGMA table_info(strategy_state)")
         final_columns = [row[1] for row in cursor.fetchall()]
-        print(f"迁移后字段: {final_columns}")
+        out.append(f"迁移后字段: {final_columns}\n")
         
         conn.close()
         
     except Exception as e:
-        print(f"迁移失败: {e}")
+        out.append(f"迁移失败: {e}\n")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        sys.stdout.write("".join(out))
 
 if __name__ == "__main__":
     db_path = "trader.db"  # 修复默认数据库文件名
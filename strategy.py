@@ -1,6 +1,18 @@
+import math
 from dataclasses import dataclass
 
-@dataclass
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba 为可选依赖：缺失时按普通 Python 函数执行
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+    prange = range
+
+@dataclass(slots=True)
 class StrategyState:
     position: str = "flat"  # flat | long | short
     pending: str | None = None  # waiting_short_entry | waiting_long_entry | waiting_short_confirm | waiting_long_confirm
@@ -22,6 +34,11 @@ class StrategyState:
             self.breakout_dn = state_dict.get('breakout_dn', False)
             self.last_close_price = state_dict.get('last_close_price')
 
+    def snapshot(self) -> tuple:
+        """按 strategy_state 表的列顺序返回状态元组（用于判断是否变化及落库）"""
+        return (self.position, self.pending, self.entry_price, self.breakout_level,
+                self.breakout_up, self.breakout_dn, self.last_close_price)
+
     def to_dict(self):
         """转换为字典用于保存"""
         return {
@@ -143,4 +160,146 @@ def decide(close_price: float, up: float, dn: float, state: StrategyState,
 
     if is_closed:
         state.last_close_price = close_price
-    return None
\ No newline at end of file
+    return None
+
+# decide_batch 使用的整数编码（下标即编码）
+POSITIONS = ("flat", "long", "short")
+PENDINGS = (None, "waiting_short_entry", "waiting_long_entry", "waiting_short_confirm", "waiting_long_confirm")
+SIGNALS = (None, "open_short", "open_long", "close_short_open_long", "close_long_open_short", "stop_loss_short", "stop_loss_long")
+
+
+@njit(cache=True)
+def _decide_kernel(close, up, dn, high, low, is_closed, pos, pend, entry, blvl, bup, bdn, last_close):
+    """decide() 的逐根循环版本：状态保存在标量局部变量中，分支与 decide() 一一对应（None 以 NaN 表示）"""
+    n = close.shape[0]
+    actions = np.zeros(n, dtype=np.int8)
+    for i in range(n):
+        c = close[i]
+        u = up[i]
+        d = dn[i]
+        if not (u == u and d == d):  # BOLL 不可用时不动作
+            continue
+        # 突破标志无分支更新（与 decide() 中先置上轨、再置下轨的两个 if 等价：同时突破时以下轨为准）
+        broke_up = (c > u) | (high[i] > u)
+        broke_dn = (c < d) | (low[i] < d)
+        bup = (bup | broke_up) & (not broke_dn)
+        bdn = broke_dn | (bdn & (not broke_up))
+
+        # 止损
+        if pos == 2:
+            if c > u:
+                pos, pend, entry, blvl = 0, 0, math.nan, math.nan
+                actions[i] = 5
+                continue
+        elif pos == 1:
+            if c < d:
+                pos, pend, entry, blvl = 0, 0, math.nan, math.nan
+                actions[i] = 6
+                continue
+
+        # 开仓/反手
+        if pos == 0:
+            if bup and pend != 1:
+                pend = 1
+                blvl = u
+            if bdn and pend != 2:
+                pend = 2
+                blvl = d
+            if pend == 1 and c < u:
+                pos, pend, entry, bup = 2, 0, c, False
+                actions[i] = 1
+                continue
+            if pend == 2 and c > d:
+                pos, pend, entry, bdn = 1, 0, c, False
+                actions[i] = 2
+                continue
+        elif pos == 2:
+            if bdn and pend != 4:
+                pend = 4
+                blvl = d
+            if pend == 4 and c > d:
+                pos, pend, entry, bdn = 1, 0, c, False
+                actions[i] = 3
+                continue
+        elif pos == 1:
+            if bup and pend != 3:
+                pend = 3
+                blvl = u
+            if pend == 3 and c < u:
+                pos, pend, entry, bup = 2, 0, c, False
+                actions[i] = 4
+                continue
+
+        if is_closed[i]:
+            if d <= c <= u and pend == 0:
+                bup = False
+                bdn = False
+            last_close = c
+    return actions, pos, pend, entry, blvl, bup, bdn, last_close
+
+
+def _f64(a, n: int) -> np.ndarray:
+    if a is None:
+        return np.full(n, np.nan)
+    return np.ascontiguousarray(a, dtype=np.float64)
+
+
+def _opt(x) -> float:
+    return math.nan if x is None else float(x)
+
+
+def decide_batch(close, up, dn, state: StrategyState | None = None,
+                 high=None, low=None, is_closed=None) -> np.ndarray:
+    """
+    对一段K线序列一次性运行 decide() 的状态机（回放/回测用），返回每根K线的信号编码数组（int8，0 表示无信号，
+    其余为 SIGNALS 的下标）。up/dn 中的 NaN 表示 BOLL 不可用；high/low 缺省时只用收盘价判断突破，
+    is_closed 缺省时视为全部已收盘。state 会被更新为序列结束时的状态（缺省从 flat 开始）。
+    与逐根调用 decide() 的结果一致，但不打印突破提示。
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n = close.shape[0]
+    if state is None:
+        state = StrategyState()
+    closed = np.ones(n, dtype=np.bool_) if is_closed is None else np.ascontiguousarray(is_closed, dtype=np.bool_)
+    actions, pos, pend, entry, blvl, bup, bdn, last_close = _decide_kernel(
+        close, _f64(up, n), _f64(dn, n), _f64(high, n), _f64(low, n), closed,
+        POSITIONS.index(state.position), PENDINGS.index(state.pending),
+        _opt(state.entry_price), _opt(state.breakout_level),
+        bool(state.breakout_up), bool(state.breakout_dn), _opt(state.last_close_price),
+    )
+    state.position = POSITIONS[pos]
+    state.pending = PENDINGS[pend]
+    state.entry_price = None if entry != entry else float(entry)
+    state.breakout_level = None if blvl != blvl else float(blvl)
+    state.breakout_up = bool(bup)
+    state.breakout_dn = bool(bdn)
+    state.last_close_price = None if last_close != last_close else float(last_close)
+    return actions
+
+
+@njit(cache=True, parallel=True)
+def _sweep_kernel(close, up, dn, high, low, is_closed):
+    """每组参数（up/dn 的一行）从 flat 独立运行一遍状态机；各行互不依赖，按行并行"""
+    m, n = up.shape
+    actions = np.zeros((m, n), dtype=np.int8)
+    for j in prange(m):
+        res = _decide_kernel(close, up[j], dn[j], high, low, is_closed,
+                             0, 0, math.nan, math.nan, False, False, math.nan)
+        actions[j, :] = res[0]
+    return actions
+
+
+def decide_sweep(close, up, dn, high=None, low=None, is_closed=None) -> np.ndarray:
+    """
+    参数扫描：同一段K线上同时回放 M 组 BOLL 参数。up/dn 为 (M, N) 数组，每行是一组参数算出的上下轨
+    （可用 indicators.rolling_boll 逐组生成），返回 (M, N) 的信号编码数组，含义同 decide_batch。
+    每组都从 flat 状态开始；安装 numba 时多核并行执行。
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n = close.shape[0]
+    up = np.ascontiguousarray(up, dtype=np.float64)
+    dn = np.ascontiguousarray(dn, dtype=np.float64)
+    if up.ndim != 2 or up.shape != dn.shape or up.shape[1] != n:
+        raise ValueError(f"up/dn 形状应为 (M, {n})，实际为 {up.shape} / {dn.shape}")
+    closed = np.ones(n, dtype=np.bool_) if is_closed is None else np.ascontiguousarray(is_closed, dtype=np.bool_)
+    return _sweep_kernel(close, up, dn, _f64(high, n), _f64(low, n), closed)
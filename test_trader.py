@@ -0,0 +1,45 @@
+import threading
+import unittest
+from unittest import mock
+
+import trader as trader_mod
+
+
+class PositionCacheTest(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.object(trader_mod, "Client"):
+            self.trader = trader_mod.Trader(None, None, "https://fapi.binance.com", position_ttl=60.0)
+
+    def test_cache_hit_within_ttl(self):
+        with mock.patch.object(self.trader, "_fetch_position_info", return_value={"position_side": "long"}) as fetch:
+            self.trader.get_position_info("BTCUSDT")
+            self.assertEqual(self.trader.get_position_info("BTCUSDT"), {"position_side": "long"})
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_invalidation_during_fetch_is_not_cached(self):
+        # 查询已发出（下单前的旧仓位），返回前本程序下单并失效缓存：旧结果不得写回缓存
+        started, release = threading.Event(), threading.Event()
+
+        def slow_fetch(symbol):
+            started.set()
+            release.wait(5)
+            return None  # 下单前：无仓位
+
+        result = {}
+        with mock.patch.object(self.trader, "_fetch_position_info", side_effect=slow_fetch):
+            t = threading.Thread(target=lambda: result.setdefault("info", self.trader.get_position_info("BTCUSDT")))
+            t.start()
+            self.assertTrue(started.wait(5))
+            self.trader._invalidate_position("BTCUSDT")  # place_market 成功后
+            release.set()
+            t.join(5)
+        self.assertIsNone(result["info"])  # 本次调用仍返回自己查到的结果
+        self.assertNotIn("BTCUSDT", self.trader._pos_cache)
+
+        with mock.patch.object(self.trader, "_fetch_position_info", return_value={"position_side": "long"}) as fetch:
+            self.assertEqual(self.trader.get_position_info("BTCUSDT"), {"position_side": "long"})
+        self.assertEqual(fetch.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
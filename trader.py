@@ -10,7 +10,8 @@ from binance.enums import SIDE_BUY, SIDE_SELL, ORDER_TYPE_MARKET
 class Trader:
     def __init__(self, api_key: Optional[str], api_secret: Optional[str], rest_base: str,
                  recv_window: int = 5000, http_timeout: int = 30, qty_precision: int = 3,
-                 price_round: int = 2, stop_loss_working_type: str = "CONTRACT_PRICE"):
+                 price_round: int = 2, stop_loss_working_type: str = "CONTRACT_PRICE",
+                 position_ttl: float = 5.0):
         # python-binance 支持通过 timeout 配置 HTTP 超时
         self.client = Client(api_key, api_secret, tld='com', requests_params={'timeout': http_timeout/1.0})
         self.recv_window = recv_window
@@ -24,6 +25,15 @@ class Trader:
         self.client.FUTURES_URL = futures_base
         # 符号过滤器缓存
         self._symbol_filters: Dict[str, Dict[str, Any]] = {}
+        # 仓位信息短TTL缓存：symbol -> (过期时刻 monotonic, 仓位信息)；本程序下单/平仓成功后立即失效
+        self.position_ttl = position_ttl
+        self._pos_cache: Dict[str, tuple[float, Optional[dict]]] = {}
+        # 每个 symbol 的失效代数：失效时 +1，查询开始前记下代数，返回时代数已变说明期间下过单，结果不写缓存
+        self._pos_gen: Dict[str, int] = {}
+
+    def _invalidate_position(self, symbol: str):
+        self._pos_gen[symbol] = self._pos_gen.get(symbol, 0) + 1
+        self._pos_cache.pop(symbol, None)
 
     # ---------------------------
     # 符号过滤器/精度
@@ -139,54 +149,64 @@ class Trader:
             return {}
 
     def get_position_info(self, symbol: str) -> Optional[dict]:
-        """获取指定交易对的仓位信息"""
+        """获取指定交易对的仓位信息（position_ttl 秒内复用上次结果，失败不缓存）"""
+        cached = self._pos_cache.get(symbol)
+        if cached is not None and time.monotonic() < cached[0]:
+            return cached[1]
+        gen = self._pos_gen.get(symbol, 0)
         try:
-            positions = self.client.futures_position_information(symbol=symbol, recvWindow=self.recv_window)
-            account_info = self.get_account_info()
-            for pos in positions:
-                if pos.get("symbol") == symbol:
-                    position_amt = float(pos.get("positionAmt", 0))
-                    if abs(position_amt) > 0.0001:  # 有仓位
-                        entry_price = float(pos.get("entryPrice", 0))
-                        mark_price = float(pos.get("markPrice", 0))
-                        leverage = int(pos.get("leverage", 1))
-                        margin_balance = float(account_info.get("totalCrossWalletBalance", 0))
-                        if margin_balance == 0:
-                            margin_balance = float(pos.get("isolatedMargin", 0))
-                        position_initial_margin = (abs(position_amt) * entry_price) / leverage
-                        total_maint_margin = float(account_info.get("totalMaintMargin", 0))
-                        total_cross_balance = float(account_info.get("totalCrossWalletBalance", 1))
-                        margin_ratio = (total_maint_margin / total_cross_balance * 100) if total_cross_balance > 0 else 0
-                        liquidation_price = float(pos.get("liquidationPrice", 0))
-                        pnl = float(pos.get("unRealizedProfit", 0))
-                        pnl_percentage = float(pos.get("percentage", 0))
-                        quantity = abs(position_amt)
-                        base_symbol = symbol.replace("USDT", "")
-                        margin_type = pos.get("marginType", "cross")
-                        margin_type_cn = "全仓" if margin_type.lower() == "cross" else "逐仓"
-                        contract = f"{base_symbol}USDT\n永续 {leverage}x"
-                        position_value = abs(position_amt) * mark_price
-                        return {
-                            "symbol": symbol,
-                            "contract": contract,
-                            "position_amt": position_amt,
-                            "quantity": quantity,
-                            "entry_price": entry_price,
-                            "mark_price": mark_price,
-                            "pnl": pnl,
-                            "pnl_percentage": pnl_percentage,
-                            "position_side": "long" if position_amt > 0 else "short",
-                            "leverage": leverage,
-                            "margin_balance": margin_balance,
-                            "position_initial_margin": position_initial_margin,
-                            "margin_ratio": margin_ratio,
-                            "liquidation_price": liquidation_price,
-                            "position_value": position_value
-                        }
-            return None
+            info = self._fetch_position_info(symbol)
         except Exception as e:
             logging.warning(f"获取仓位信息失败: {e}")
             return None
+        if self._pos_gen.get(symbol, 0) == gen:  # 查询期间没有下单/平仓，结果仍可缓存
+            self._pos_cache[symbol] = (time.monotonic() + self.position_ttl, info)
+        return info
+
+    def _fetch_position_info(self, symbol: str) -> Optional[dict]:
+        positions = self.client.futures_position_information(symbol=symbol, recvWindow=self.recv_window)
+        account_info = self.get_account_info()
+        for pos in positions:
+            if pos.get("symbol") == symbol:
+                position_amt = float(pos.get("positionAmt", 0))
+                if abs(position_amt) > 0.0001:  # 有仓位
+                    entry_price = float(pos.get("entryPrice", 0))
+                    mark_price = float(pos.get("markPrice", 0))
+                    leverage = int(pos.get("leverage", 1))
+                    margin_balance = float(account_info.get("totalCrossWalletBalance", 0))
+                    if margin_balance == 0:
+                        margin_balance = float(pos.get("isolatedMargin", 0))
+                    position_initial_margin = (abs(position_amt) * entry_price) / leverage
+                    total_maint_margin = float(account_info.get("totalMaintMargin", 0))
+                    total_cross_balance = float(account_info.get("totalCrossWalletBalance", 1))
+                    margin_ratio = (total_maint_margin / total_cross_balance * 100) if total_cross_balance > 0 else 0
+                    liquidation_price = float(pos.get("liquidationPrice", 0))
+                    pnl = float(pos.get("unRealizedProfit", 0))
+                    pnl_percentage = float(pos.get("percentage", 0))
+                    quantity = abs(position_amt)
+                    base_symbol = symbol.replace("USDT", "")
+                    margin_type = pos.get("marginType", "cross")
+                    margin_type_cn = "全仓" if margin_type.lower() == "cross" else "逐仓"
+                    contract = f"{base_symbol}USDT\n永续 {leverage}x"
+                    position_value = abs(position_amt) * mark_price
+                    return {
+                        "symbol": symbol,
+                        "contract": contract,
+                        "position_amt": position_amt,
+                        "quantity": quantity,
+                        "entry_price": entry_price,
+                        "mark_price": mark_price,
+                        "pnl": pnl,
+                        "pnl_percentage": pnl_percentage,
+                        "position_side": "long" if position_amt > 0 else "short",
+                        "leverage": leverage,
+                        "margin_balance": margin_balance,
+                        "position_initial_margin": position_initial_margin,
+                        "margin_ratio": margin_ratio,
+                        "liquidation_price": liquidation_price,
+                        "position_value": position_value
+                    }
+        return None
 
     def calc_qty(self, symbol: str, price: float, max_position_pct: float) -> float:
         usdt = self.get_balance_usdt()
@@ -211,6 +231,7 @@ class Trader:
             reduceOnly=False,
             recvWindow=self.recv_window,
         )
+        self._invalidate_position(symbol)
         return order
 
     def get_position_quantity(self, symbol: str) -> tuple[float, str]:
@@ -246,6 +267,7 @@ class Trader:
             reduceOnly=True,
             recvWindow=self.recv_window,
         )
+        self._invalidate_position(symbol)
         return order
 
     def close_all_position(self, symbol: str):
@@ -267,6 +289,7 @@ class Trader:
                 reduceOnly=True,
                 recvWindow=self.recv_window,
             )
+            self._invalidate_position(symbol)
             logging.info(f"市价全部平仓成功: {symbol} {direction} {qty}")
             return order
         except Exception as e:
@@ -297,6 +320,7 @@ class Trader:
                 workingType=self.stop_loss_working_type,
                 recvWindow=self.recv_window,
             )
+            self._invalidate_position(symbol)
             logging.info(f"STOP_MARKET全部平仓成功: {symbol} {direction}")
             return order
         except Exception as e:
@@ -1,3 +1,4 @@
+import functools
 import threading
 import subprocess
 import sqlite3
@@ -5,15 +6,17 @@ import json
 import urllib.request
 import socket
 import time
-from datetime import datetime, timezone
+from datetime import datetime
 from zoneinfo import ZoneInfo
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 
 from flask import Flask, jsonify, Response, request
-import statistics as stats
+import math
+import numpy as np
 # New imports for WS realtime price
 import asyncio
 from ws_client import WSClient, KlineEvent
+from db import shared_conn
 
 
 def _kill_port(port: int) -> None:
@@ -48,10 +51,9 @@ def _can_bind(port: int) -> bool:
             pass
 
 
-def _connect(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+def _connect(db_path: str):
+    # 复用进程级共享连接（Flask 每个请求一个线程，逐次新建连接代价高）
+    return shared_conn(db_path)
 
 
 def _recent_signals(db_path: str, limit: int = 20) -> List[Dict[str, Any]]:
@@ -59,7 +61,7 @@ def _recent_signals(db_path: str, limit: int = 20) -> List[Dict[str, Any]]:
         cur = conn.execute(
             "SELECT ts, signal, price FROM signals ORDER BY ts DESC LIMIT ?", (limit,)
         )
-        rows = [dict(r) for r in cur.fetchall()]
+        rows = [dict(r) for r in cur]
         for r in rows:
             r["ts_local"] = _fmt_ts(r["ts"])
         return rows
@@ -68,86 +70,101 @@ def _recent_signals(db_path: str, limit: int = 20) -> List[Dict[str, Any]]:
 
 
 
+# 交易方向 -> (操作类型, 方向)
+_SIDE_LABELS: Dict[str, Tuple[str, str]] = {
+    "BUY": ("买", "LONG"),              # 开仓多头
+    "BUY_OPEN": ("买", "LONG"),
+    "SELL": ("买", "SHORT"),            # 开仓空头
+    "SELL_OPEN": ("买", "SHORT"),
+    "BUY_CLOSE": ("平", "SHORT"),       # 平仓，平的是空仓
+    "BUY_STOP_LOSS": ("平", "SHORT"),   # 止损平仓，平的是空仓
+    "SELL_CLOSE": ("平", "LONG"),       # 平仓，平的是多仓
+    "SELL_STOP_LOSS": ("平", "LONG"),   # 止损平仓，平的是多仓
+}
+_UNKNOWN_SIDE_LABEL: Tuple[str, str] = ("未知", "未知")
+
+_PAIRABLE_TRADES_SQL = "SELECT ts, side, qty, price FROM trades WHERE side IN ('BUY','SELL','BUY_CLOSE','SELL_CLOSE','BUY_OPEN','SELL_OPEN') ORDER BY ts ASC, id ASC"
+
+
+def _pair_trades(trades: Iterable[sqlite3.Row]) -> List[Dict[str, Any]]:
+    """将按时间升序的成交记录两两配对（开仓 -> 平仓）并计算盈亏。
+    trades 可直接传入游标：逐行读取到列数组，不物化 Row 列表。
+    等价于逐条扫描：相邻两条构成有效交易对时一起消费，否则前进一条；
+    有效性判定与盈亏计算用 NumPy 向量化完成，只对配对成功的记录做 Python 级处理。
+    - BUY/BUY_OPEN -> SELL/SELL_CLOSE：多仓，pnl = (平仓价 - 开仓价) * min(qty)
+    - SELL/SELL_OPEN -> BUY/BUY_CLOSE：空仓，pnl = (开仓价 - 平仓价) * min(qty)
+    """
+    ts_col: List[int] = []
+    side_col: List[str] = []
+    price_col: List[float] = []
+    qty_col: List[float] = []
+    for t in trades:
+        ts_col.append(t["ts"])
+        side_col.append(t["side"])
+        price_col.append(np.nan if t["price"] is None else float(t["price"]))
+        qty_col.append(0.0 if t["qty"] is None else float(t["qty"]))
+    n = len(ts_col)
+    if n < 2:
+        return []
+    sides = np.array(side_col)
+    prices = np.array(price_col, dtype=np.float64)
+    qtys = np.array(qty_col, dtype=np.float64)
+
+    priced = ~np.isnan(prices)
+    priced = priced[:-1] & priced[1:]
+    is_long = priced & np.isin(sides[:-1], ("BUY", "BUY_OPEN")) & np.isin(sides[1:], ("SELL", "SELL_CLOSE"))
+    is_short = priced & np.isin(sides[:-1], ("SELL", "SELL_OPEN")) & np.isin(sides[1:], ("BUY", "BUY_CLOSE"))
+    valid = is_long | is_short
+
+    # 贪心配对：在连续的有效位置段内，只取相对段首偏移为偶数的位置（奇数位已被前一对消费）
+    idx = np.arange(n - 1)
+    run_start = np.maximum.accumulate(np.where(valid & ~np.r_[False, valid[:-1]], idx, 0))
+    taken = np.flatnonzero(valid & ((idx - run_start) % 2 == 0))
+
+    entry = prices[taken]
+    exit_ = prices[taken + 1]
+    qty = np.minimum(qtys[taken], qtys[taken + 1])
+    long_mask = is_long[taken]
+    pnl = np.where(long_mask, exit_ - entry, entry - exit_) * qty
+
+    pairs = []
+    for j, i in enumerate(taken.tolist()):
+        pairs.append({
+            "open_ts": ts_col[i],
+            "close_ts": ts_col[i + 1],
+            "side": "long" if long_mask[j] else "short",
+            "entry_price": float(entry[j]),
+            "exit_price": float(exit_[j]),
+            "qty": float(qty[j]),
+            "pnl": float(pnl[j]),
+        })
+    return pairs
+
+
 def _recent_trades(db_path: str, limit: int = 50) -> List[Dict[str, Any]]:
     with _connect(db_path) as conn:
         cur = conn.execute(
             "SELECT ts, side, qty, price, order_id, status FROM trades ORDER BY ts DESC LIMIT ?",
             (limit,),
         )
-        rows = [dict(r) for r in cur.fetchall()]
+        rows = [dict(r) for r in cur]
         
         # 为每笔交易添加时间格式化、操作类型和方向
         for r in rows:
             r["ts_local"] = _fmt_ts(r["ts"])
             r["pnl"] = None  # 默认无盈亏
             
-            # 根据side字段确定操作类型和方向
-            side = r["side"]
-            if side in ["BUY", "BUY_OPEN"]:
-                r["action_type"] = "买"  # 开仓多头
-                r["direction"] = "LONG"
-            elif side in ["SELL", "SELL_OPEN"]:
-                r["action_type"] = "买"  # 开仓空头
-                r["direction"] = "SHORT"
-            elif side == "BUY_CLOSE":
-                r["action_type"] = "平"  # 平仓
-                r["direction"] = "SHORT"  # 平的是空仓
-            elif side == "BUY_STOP_LOSS":
-                r["action_type"] = "平"  # 止损平仓
-                r["direction"] = "SHORT"  # 平的是空仓
-            elif side == "SELL_CLOSE":
-                r["action_type"] = "平"  # 平仓
-                r["direction"] = "LONG"   # 平的是多仓
-            elif side == "SELL_STOP_LOSS":
-                r["action_type"] = "平"  # 止损平仓
-                r["direction"] = "LONG"   # 平的是多仓
-            else:
-                r["action_type"] = "未知"
-                r["direction"] = "未知"
+            # 根据side字段确定操作类型和方向（查表）
+            r["action_type"], r["direction"] = _SIDE_LABELS.get(r["side"], _UNKNOWN_SIDE_LABEL)
         
         # 获取所有交易记录用于配对计算盈亏
-        cur_all = conn.execute(
-            "SELECT ts, side, qty, price FROM trades WHERE side IN ('BUY','SELL','BUY_CLOSE','SELL_CLOSE','BUY_OPEN','SELL_OPEN') ORDER BY ts ASC"
-        )
-        all_trades = cur_all.fetchall()
+        cur = conn.execute(_PAIRABLE_TRADES_SQL)
         
         # 创建交易配对的盈亏映射
         pnl_map = {}  # {timestamp: pnl}
-        
-        # 配对交易计算盈亏
-        i = 0
-        while i < len(all_trades) - 1:
-            trade1 = all_trades[i]
-            trade2 = all_trades[i + 1]
-            
-            side1 = trade1["side"]
-            side2 = trade2["side"]
-            price1 = float(trade1["price"]) if trade1["price"] is not None else None
-            price2 = float(trade2["price"]) if trade2["price"] is not None else None
-            qty1 = float(trade1["qty"]) if trade1["qty"] is not None else 0.0
-            qty2 = float(trade2["qty"]) if trade2["qty"] is not None else 0.0
-            
-            if price1 is None or price2 is None:
-                i += 1
-                continue
-            
-            # 检查是否为有效的交易对
-            pnl = 0.0
-            
-            # BUY -> SELL (多仓盈亏)
-            if side1 in ("BUY", "BUY_OPEN") and side2 in ("SELL", "SELL_CLOSE"):
-                pnl = (price2 - price1) * min(qty1, qty2)  # 平仓金额 - 开仓金额
-                pnl_map[trade1["ts"]] = -pnl  # 开仓交易显示负值（投入）
-                pnl_map[trade2["ts"]] = pnl   # 平仓交易显示盈亏
-                i += 2
-            # SELL -> BUY (空仓盈亏)  
-            elif side1 in ("SELL", "SELL_OPEN") and side2 in ("BUY", "BUY_CLOSE"):
-                pnl = (price1 - price2) * min(qty1, qty2)  # 平仓金额 - 开仓金额
-                pnl_map[trade1["ts"]] = -pnl  # 开仓交易显示负值（投入）
-                pnl_map[trade2["ts"]] = pnl   # 平仓交易显示盈亏
-                i += 2
-            else:
-                i += 1
+        for p in _pair_trades(cur):
+            pnl_map[p["open_ts"]] = -p["pnl"]  # 开仓交易显示负值（投入）
+            pnl_map[p["close_ts"]] = p["pnl"]  # 平仓交易显示盈亏
         
         # 将盈亏信息添加到交易记录中
         for r in rows:
@@ -184,7 +201,7 @@ def _compute_current_position(db_path: str, trader: Optional[Any] = None, symbol
     
     # 当没有传入 trader 实例时，前端展示降级为“空仓”，避免接口 500（用于本地预览/无交易环境）
     if trader is None:
-        ts_now = int(time.time() * 1000)
+        ts_now = time.time_ns() // 1_000_000
         return {
             "position": "flat",
             "ts": ts_now,
@@ -199,7 +216,7 @@ def _compute_current_position(db_path: str, trader: Optional[Any] = None, symbol
             open_time = _get_latest_open_time(db_path)
             if open_time is None:
                 # 如果没有找到开仓时间，使用当前时间
-                open_time = int(time.time() * 1000)
+                open_time = time.time_ns() // 1_000_000
             
             return {
                 "position": position_info["position_side"],
@@ -220,10 +237,11 @@ def _compute_current_position(db_path: str, trader: Optional[Any] = None, symbol
             }
         else:
             # API显示无仓位
+            ts_now = time.time_ns() // 1_000_000
             return {
                 "position": "flat",
-                "ts": int(time.time() * 1000),
-                "ts_local": _fmt_ts(int(time.time() * 1000)),
+                "ts": ts_now,
+                "ts_local": _fmt_ts(ts_now),
                 "source": "binance_api"
             }
     except Exception as e:
@@ -235,62 +253,24 @@ def _compute_last_closed_pnl(db_path: str) -> Optional[Dict[str, Any]]:
     """Find the latest completed trade pair to compute realized PnL."""
     with _connect(db_path) as conn:
         # 获取所有交易记录，按时间排序
-        cur = conn.execute(
-            "SELECT ts, side, qty, price FROM trades WHERE side IN ('BUY','SELL','BUY_CLOSE','SELL_CLOSE','BUY_OPEN','SELL_OPEN') ORDER BY ts ASC"
-        )
-        all_trades = cur.fetchall()
+        cur = conn.execute(_PAIRABLE_TRADES_SQL)
         
         # 找到最后一个完成的交易对
-        last_completed = None
-        i = 0
-        while i < len(all_trades) - 1:
-            trade1 = all_trades[i]
-            trade2 = all_trades[i + 1]
-            
-            side1 = trade1["side"]
-            side2 = trade2["side"]
-            price1 = float(trade1["price"]) if trade1["price"] is not None else None
-            price2 = float(trade2["price"]) if trade2["price"] is not None else None
-            qty1 = float(trade1["qty"]) if trade1["qty"] is not None else 0.0
-            qty2 = float(trade2["qty"]) if trade2["qty"] is not None else 0.0
-            
-            if price1 is None or price2 is None:
-                i += 1
-                continue
-            
-            # 检查是否为有效的交易对
-            # BUY -> SELL (多仓盈亏)
-            if side1 in ("BUY", "BUY_OPEN") and side2 in ("SELL", "SELL_CLOSE"):
-                pnl = (price2 - price1) * min(qty1, qty2)
-                last_completed = {
-                    "side": "long",
-                    "entry_price": price1,
-                    "exit_price": price2,
-                    "qty": min(qty1, qty2),
-                    "pnl": pnl,
-                    "open_time": trade1["ts"],
-                    "open_time_local": _fmt_ts(trade1["ts"]),
-                    "close_time": trade2["ts"],
-                    "close_time_local": _fmt_ts(trade2["ts"]),
-                }
-                i += 2
-            # SELL -> BUY (空仓盈亏)  
-            elif side1 in ("SELL", "SELL_OPEN") and side2 in ("BUY", "BUY_CLOSE"):
-                pnl = (price1 - price2) * min(qty1, qty2)
-                last_completed = {
-                    "side": "short",
-                    "entry_price": price1,
-                    "exit_price": price2,
-                    "qty": min(qty1, qty2),
-                    "pnl": pnl,
-                    "open_time": trade1["ts"],
-                    "open_time_local": _fmt_ts(trade1["ts"]),
-                    "close_time": trade2["ts"],
-                    "close_time_local": _fmt_ts(trade2["ts"]),
-                }
-                i += 2
-            else:
-                i += 1
+        pairs = _pair_trades(cur)
+        if not pairs:
+            return None
+        p = pairs[-1]
+        last_completed = {
+            "side": p["side"],
+            "entry_price": p["entry_price"],
+            "exit_price": p["exit_price"],
+            "qty": p["qty"],
+            "pnl": p["pnl"],
+            "open_time": p["open_ts"],
+            "open_time_local": _fmt_ts(p["open_ts"]),
+            "close_time": p["close_ts"],
+            "close_time_local": _fmt_ts(p["close_ts"]),
+        }
         
         return last_completed
 
@@ -314,7 +294,7 @@ def _get_error_logs(db_path: str, limit: int = 50) -> List[Dict[str, Any]]:
         cur = conn.execute(
             "SELECT ts, where_, error FROM errors ORDER BY ts DESC LIMIT ?", (limit,)
         )
-        rows = [dict(r) for r in cur.fetchall()]
+        rows = [dict(r) for r in cur]
         for r in rows:
             r["ts_local"] = _fmt_ts(r["ts"])
         return rows
@@ -325,61 +305,20 @@ def _get_pnl_records(db_path: str, limit: int = 20) -> List[Dict[str, Any]]:
     records = []
     with _connect(db_path) as conn:
         # 获取所有交易记录，按时间排序
-        cur = conn.execute(
-            "SELECT ts, side, qty, price FROM trades WHERE side IN ('BUY','SELL','BUY_CLOSE','SELL_CLOSE','BUY_OPEN','SELL_OPEN') ORDER BY ts ASC"
-        )
-        all_trades = cur.fetchall()
+        cur = conn.execute(_PAIRABLE_TRADES_SQL)
         
         # 配对交易计算盈亏
-        i = 0
-        while i < len(all_trades) - 1:
-            trade1 = all_trades[i]
-            trade2 = all_trades[i + 1]
-            
-            side1 = trade1["side"]
-            side2 = trade2["side"]
-            price1 = float(trade1["price"]) if trade1["price"] is not None else None
-            price2 = float(trade2["price"]) if trade2["price"] is not None else None
-            qty1 = float(trade1["qty"]) if trade1["qty"] is not None else 0.0
-            qty2 = float(trade2["qty"]) if trade2["qty"] is not None else 0.0
-            
-            if price1 is None or price2 is None:
-                i += 1
-                continue
-            
-            # 检查是否为有效的交易对
-            pnl = 0.0
-            
-            # BUY -> SELL (多仓盈亏)
-            if side1 in ("BUY", "BUY_OPEN") and side2 in ("SELL", "SELL_CLOSE"):
-                pnl = (price2 - price1) * min(qty1, qty2)
-                records.append({
-                    "ts": trade2["ts"],
-                    "ts_local": _fmt_ts(trade2["ts"]),
-                    "side": "long",
-                    "entry_price": price1,
-                    "exit_price": price2,
-                    "qty": min(qty1, qty2),
-                    "pnl": pnl
-                })
-                # 跳过已配对的交易
-                i += 2
-            # SELL -> BUY (空仓盈亏)  
-            elif side1 in ("SELL", "SELL_OPEN") and side2 in ("BUY", "BUY_CLOSE"):
-                pnl = (price1 - price2) * min(qty1, qty2)
-                records.append({
-                    "ts": trade2["ts"],
-                    "ts_local": _fmt_ts(trade2["ts"]),
-                    "side": "short",
-                    "entry_price": price1,
-                    "exit_price": price2,
-                    "qty": min(qty1, qty2),
-                    "pnl": pnl
-                })
-                # 跳过已配对的交易
-                i += 2
-            else:
-                i += 1
+        for p in _pair_trades(cur):
+            close_ts = p["close_ts"]
+            records.append({
+                "ts": close_ts,
+                "ts_local": _fmt_ts(close_ts),
+                "side": p["side"],
+                "entry_price": p["entry_price"],
+                "exit_price": p["exit_price"],
+                "qty": p["qty"],
+                "pnl": p["pnl"]
+            })
         
         # 按时间倒序排列，限制数量
         records.sort(key=lambda x: x["ts"], reverse=True)
@@ -401,55 +340,18 @@ def _get_daily_stats(db_path: str, days: int = 7, trader: Optional[Any] = None)
     
     with _connect(db_path) as conn:
         # 获取所有交易记录，按时间排序
-        cur = conn.execute(
-            "SELECT ts, side, qty, price FROM trades WHERE side IN ('BUY','SELL','BUY_CLOSE','SELL_CLOSE','BUY_OPEN','SELL_OPEN') ORDER BY ts ASC"
-        )
-        all_trades = cur.fetchall()
+        cur = conn.execute(_PAIRABLE_TRADES_SQL)
         
         # 按日期分组统计
         daily_data = {}
         
         # 配对交易计算盈亏
-        i = 0
-        while i < len(all_trades) - 1:
-            trade1 = all_trades[i]
-            trade2 = all_trades[i + 1]
-            
-            side1 = trade1["side"]
-            side2 = trade2["side"]
-            price1 = float(trade1["price"]) if trade1["price"] is not None else None
-            price2 = float(trade2["price"]) if trade2["price"] is not None else None
-            qty1 = float(trade1["qty"]) if trade1["qty"] is not None else 0.0
-            qty2 = float(trade2["qty"]) if trade2["qty"] is not None else 0.0
-            
-            if price1 is None or price2 is None:
-                i += 1
-                continue
-            
-            # 检查是否为有效的交易对
-            pnl = 0.0
-            trade_date = None
-            
-            # BUY -> SELL (多仓盈亏)
-            if side1 in ("BUY", "BUY_OPEN") and side2 in ("SELL", "SELL_CLOSE"):
-                pnl = (price2 - price1) * min(qty1, qty2)
-                trade_date = _fmt_ts(trade2["ts"]).split(' ')[0]
-            # SELL -> BUY (空仓盈亏)  
-            elif side1 in ("SELL", "SELL_OPEN") and side2 in ("BUY", "BUY_CLOSE"):
-                pnl = (price1 - price2) * min(qty1, qty2)
-                trade_date = _fmt_ts(trade2["ts"]).split(' ')[0]
-            
-            if trade_date:
-                if trade_date not in daily_data:
-                    daily_data[trade_date] = {'trades': 0, 'total_pnl': 0.0}
-                
-                daily_data[trade_date]['trades'] += 1
-                daily_data[trade_date]['total_pnl'] += pnl
-                
-                # 跳过已配对的交易
-                i += 2
-            else:
-                i += 1
+        for p in _pair_trades(cur):
+            trade_date = _fmt_ts(p["close_ts"]).split(' ')[0]
+            if trade_date not in daily_data:
+                daily_data[trade_date] = {'trades': 0, 'total_pnl': 0.0}
+            daily_data[trade_date]['trades'] += 1
+            daily_data[trade_date]['total_pnl'] += p["pnl"]
         
         # 转换为列表并计算利润率
         for date_str, data in sorted(daily_data.items(), reverse=True)[:days]:
@@ -587,14 +489,14 @@ def create_app(cfg: Any, trader: Optional[Any] = None) -> Flask:
             order = trader_obj.place_market(c["symbol"], side=side, qty=qty)
             order_id = str(order.get("orderId"))
             status = order.get("status")
-            ts = int(time.time() * 1000)
+            ts = time.time_ns() // 1_000_000
             _log_trade_sync(c["db_path"], ts, side, qty, price, order_id, status)
             return jsonify({"ok": True, "side": side, "qty": qty, "price": price, "order_id": order_id, "status": status})
         except Exception as e:
             # best-effort error log
             try:
                 with _connect(c["db_path"]) as conn:
-                    conn.execute("INSERT INTO errors(ts, where_, error) VALUES (?,?,?)", (int(time.time()*1000), "api_test_order", str(e)))
+                    conn.execute("INSERT INTO errors(ts, where_, error) VALUES (?,?,?)", (time.time_ns() // 1_000_000, "api_test_order", str(e)))
                     conn.commit()
             except Exception:
                 pass
@@ -941,13 +843,19 @@ def _set_tz(name: str) -> None:
     except Exception:
         _TZ = ZoneInfo("Asia/Shanghai")
         _TZ_NAME = "Asia/Shanghai"
+    _fmt_minute.cache_clear()
+
+
+@functools.lru_cache(maxsize=4096)
+def _fmt_minute(minute: int) -> str:
+    # 展示精度为分钟：同一分钟内的时间戳共用一次时区换算 + strftime 结果
+    return datetime.fromtimestamp(minute * 60, _TZ).strftime("%m-%d %H:%M")
 
 
 def _fmt_ts(ts_ms: int) -> str:
     try:
         # interpret stored ms since epoch as UTC, convert to target TZ
-        dt = datetime.utcfromtimestamp(ts_ms / 1000.0).replace(tzinfo=timezone.utc).astimezone(_TZ)
-        return dt.strftime("%m-%d %H:%M")
+        return _fmt_minute(int(ts_ms) // 60_000)
     except Exception:
         try:
             dt = datetime.fromtimestamp(ts_ms / 1000.0)
@@ -1012,28 +920,20 @@ def _get_realtime_boll(db_path: str, window: int, boll_multiplier: float, boll_d
     返回的时间戳使用当前本地时间（毫秒），用于在UI显示读秒。
     """
     try:
-        with _connect(db_path) as conn:
-            # 最近 window-1 根已收盘K线
-            cur1 = conn.execute(
-                "SELECT close FROM klines WHERE is_closed=1 ORDER BY open_time DESC LIMIT ?",
-                (max(0, window - 1),)
-            )
-            rows_closed = [float(r[0]) for r in cur1.fetchall()]
-            rows_closed.reverse()  # 按时间正序
-
-            # 最新价格（优先使用WS，其次REST，最后DB）
-            last_close: Optional[float] = None
-            source = "db"
-            p_ws = _get_ws_price()
-            if p_ws is not None:
-                last_close = float(p_ws)
-                source = "ws"
-            elif symbol:
-                p = _fetch_latest_price(symbol)
-                if p is not None:
-                    last_close = p
-                    source = "exchange"
+        # 最新价格（优先使用WS，其次REST，最后DB）；网络请求放在持有共享连接之前
+        last_close: Optional[float] = None
+        source = "db"
+        p_ws = _get_ws_price()
+        if p_ws is not None:
+            last_close = float(p_ws)
+            source = "ws"
+        elif symbol:
+            p = _fetch_latest_price(symbol)
+            if p is not None:
+                last_close = p
+                source = "exchange"
 
+        with _connect(db_path) as conn:
             if last_close is None:
                 # 回退：数据库中最新一条K线（可能未收盘）的close
                 cur2 = conn.execute(
@@ -1045,21 +945,27 @@ def _get_realtime_boll(db_path: str, window: int, boll_multiplier: float, boll_d
                 last_close = float(r[0])
                 source = "db"
 
-            closes = rows_closed + [last_close]
-            if len(closes) < window:
+            # 最近 window-1 根已收盘K线：直接在 SQLite 内聚合出数量/和/平方和，不把收盘价逐行拉回 Python。
+            # 以最新价为基准做平移（最新价自身贡献为 0），避免大价格平方相减的精度损失。
+            n_closed, s_off, s2_off = conn.execute(
+                "SELECT COUNT(*), TOTAL(close - :p), TOTAL((close - :p) * (close - :p)) "
+                "FROM (SELECT close FROM klines WHERE is_closed=1 ORDER BY open_time DESC LIMIT :n)",
+                {"p": last_close, "n": max(0, window - 1)},
+            ).fetchone()
+            n = n_closed + 1
+            if n < window or n <= boll_ddof:
                 # 数据不足时不返回实时BOLL
                 return {"ma": None, "std": None, "up": None, "dn": None, "timestamp": None, "time_local": None, "price": None, "source": None}
 
             # 计算
-            if boll_ddof == 1:
-                std_val = stats.stdev(closes)
-            else:
-                std_val = stats.pstdev(closes)
-            ma_val = sum(closes) / len(closes)
+            mean_off = s_off / n
+            var = (s2_off - s_off * mean_off) / (n - boll_ddof)
+            std_val = math.sqrt(max(var, 0.0))
+            ma_val = last_close + mean_off
             up_val = ma_val + boll_multiplier * std_val
             dn_val = ma_val - boll_multiplier * std_val
 
-            now_ms = int(time.time() * 1000)
+            now_ms = time.time_ns() // 1_000_000
             return {
                 "ma": round(ma_val, 2),
                 "std": round(float(std_val), 4),
@@ -1104,7 +1010,7 @@ def _ensure_ws_price_feed(app: Flask) -> None:
             # Update forming bar close as realtime price
             with _RT_PRICE_LOCK:
                 _RT_PRICE["price"] = float(evt.close)
-                _RT_PRICE["ts"] = int(time.time() * 1000)
+                _RT_PRICE["ts"] = time.time_ns() // 1_000_000
         try:
             loop.run_until_complete(client.connect_and_listen(on_kline))
         except asyncio.CancelledError:
@@ -6,8 +6,13 @@ from dataclasses import dataclass
 
 import websockets
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖：缺失时 fast_recv 退回标准库 json
+    orjson = None
 
-@dataclass
+
+@dataclass(slots=True)
 class KlineEvent:
     open_time: int
     close_time: int
@@ -30,6 +35,7 @@ class WSClient:
         backoff_initial: int = 1,
         backoff_max: int = 60,
         open_timeout: int = 20,
+        fast_recv: bool = False,
     ):
         self.ws_base = ws_base.rstrip("/")
         self.symbol = symbol.lower()
@@ -39,6 +45,8 @@ class WSClient:
         self.backoff_initial = backoff_initial
         self.backoff_max = backoff_max
         self.open_timeout = open_timeout
+        # fast_recv：用 orjson（C 实现）解析每帧消息，可用时才生效
+        self._loads = orjson.loads if (fast_recv and orjson is not None) else json.loads
         self._stop = asyncio.Event()
 
     @property
@@ -80,21 +88,18 @@ class WSClient:
                             logging.info(f"Connected WS: {url}")
                             backoff = self.backoff_initial
                             connected = True
+                            loads = self._loads
                             async for msg in ws:
                                 try:
-                                    data = json.loads(msg)
+                                    data = loads(msg)
                                     payload = data.get("data", data)  # support /stream envelope
                                     if "k" in payload:
                                         k = payload["k"]
+                                        # 按字段顺序位置传参（open_time, close_time, o, h, l, c, v, is_closed），比关键字参数少一次匹配
                                         evt = KlineEvent(
-                                            open_time=int(k["t"]),
-                                            close_time=int(k["T"]),
-                                            open=float(k["o"]),
-                                            high=float(k["h"]),
-                                            low=float(k["l"]),
-                                            close=float(k["c"]),
-                                            volume=float(k["v"]),
-                                            is_closed=bool(k["x"]),
+                                            int(k["t"]), int(k["T"]),
+                                            float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]),
+                                            bool(k["x"]),
                                         )
                                         await on_kline(evt)
                                 except Exception: